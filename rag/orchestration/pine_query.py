@@ -1,12 +1,24 @@
 from __future__ import annotations
 
+import copy
+import functools
 import json
+import os
+import sys
 from pathlib import Path
 from typing import Any
 
 
 RETRIEVAL_MODES = {"reference_only", "reference_plus_guides"}
 PINE_VERSIONS = {"v5", "v6"}
+INTERNED_CHUNK_FIELDS = (
+    "doc_type",
+    "pine_version",
+    "symbol_type",
+    "run_id",
+    "canonical_url",
+    "source_artifact_id",
+)
 
 
 def _repo_root() -> Path:
@@ -15,7 +27,7 @@ def _repo_root() -> Path:
 
 def _load_jsonl(path: Path) -> list[dict[str, Any]]:
     records = []
-    with path.open("r", encoding="utf-8") as handle:
+    with path.open("rb") as handle:
         for line in handle:
             line = line.strip()
             if not line:
@@ -27,20 +39,65 @@ def _load_jsonl(path: Path) -> list[dict[str, Any]]:
 def _latest_index_dir(base_dir: Path) -> Path:
     if not base_dir.exists():
         raise FileNotFoundError(str(base_dir))
-    dirs = [path for path in base_dir.iterdir() if path.is_dir()]
-    if not dirs:
+    return _latest_index_dir_at(base_dir, base_dir.stat().st_mtime_ns)
+
+
+@functools.lru_cache(maxsize=8)
+def _latest_index_dir_at(base_dir: Path, mtime_ns: int) -> Path:
+    with os.scandir(base_dir) as entries:
+        latest = max(
+            (entry.name for entry in entries if entry.is_dir()),
+            default=None,
+        )
+    if latest is None:
         raise FileNotFoundError(str(base_dir))
-    return sorted(dirs, key=lambda item: item.name)[-1]
+    return base_dir / latest
+
+
+@functools.lru_cache(maxsize=16)
+def _load_chunks(index_dir: Path, doc_type: str) -> dict[str, tuple[Any, ...]]:
+    shard_path = index_dir / f"chunks_{doc_type}.jsonl"
+    if shard_path.exists():
+        chunks = _load_jsonl(shard_path)
+    else:
+        chunks = _load_jsonl(index_dir / "chunks.jsonl")
+        chunks = [chunk for chunk in chunks if chunk.get("doc_type") == doc_type]
+    for chunk in chunks:
+        _intern_fields(chunk)
+    return _chunk_columns(chunks)
+
+
+def _chunk_columns(chunks: list[dict[str, Any]]) -> dict[str, tuple[Any, ...]]:
+    return {
+        "chunk_id": tuple(chunk.get("chunk_id") for chunk in chunks),
+        "content": tuple(chunk.get("body") for chunk in chunks),
+        "source_type": tuple(chunk.get("doc_type") for chunk in chunks),
+        "reference_symbol_id": tuple(chunk.get("reference_symbol_id") for chunk in chunks),
+        "provenance": tuple(_build_provenance(chunk) for chunk in chunks),
+    }
+
 
+def _intern_fields(chunk: dict[str, Any]) -> None:
+    for key in INTERNED_CHUNK_FIELDS:
+        value = chunk.get(key)
+        if isinstance(value, str):
+            chunk[key] = sys.intern(value)
 
-def _load_index(index_dir: Path) -> tuple[list[dict[str, Any]], dict[str, Any]]:
-    chunks_path = index_dir / "chunks.jsonl"
+
+@functools.lru_cache(maxsize=8)
+def _load_index_meta(index_dir: Path) -> dict[str, Any]:
     meta_path = index_dir / "index_meta.json"
-    chunks = _load_jsonl(chunks_path)
-    meta = json.loads(meta_path.read_text(encoding="utf-8"))
-    return chunks, meta
+    return json.loads(meta_path.read_text(encoding="utf-8"))
+
 
+def _load_index(
+    index_dir: Path, doc_types: tuple[str, ...]
+) -> tuple[dict[str, dict[str, tuple[Any, ...]]], dict[str, Any]]:
+    chunks_by_type = {doc_type: _load_chunks(index_dir, doc_type) for doc_type in doc_types}
+    return chunks_by_type, _load_index_meta(index_dir)
 
+
+@functools.lru_cache(maxsize=8)
 def _load_enrichment(pine_version: str) -> dict[str, dict[str, Any]]:
     root = _repo_root()
     enrichment_path = root / "artifacts" / "enrichment" / pine_version / "reference_symbols_enrichment.jsonl"
@@ -70,31 +127,54 @@ def pine_query(query: str, pine_version: str, mode: str) -> dict[str, Any]:
     root = _repo_root()
     index_base = root / "artifacts" / "rag_indexes" / pine_version
     index_dir = _latest_index_dir(index_base)
-    chunks, meta = _load_index(index_dir)
+    return _pine_query_at(query, pine_version, mode, index_dir)
+
 
-    if mode == "reference_only":
-        filtered = [chunk for chunk in chunks if chunk.get("doc_type") == "reference"]
+@functools.lru_cache(maxsize=32)
+def _query_rows(
+    pine_version: str, mode: str, index_dir: Path
+) -> tuple[tuple[Any, ...], ...]:
+    if mode == "reference_only" or pine_version == "v5":
+        doc_types = ("reference",)
     else:
-        if pine_version == "v5":
-            filtered = [chunk for chunk in chunks if chunk.get("doc_type") == "reference"]
-        else:
-            filtered = [chunk for chunk in chunks if chunk.get("doc_type") in {"reference", "guide"}]
+        doc_types = ("reference", "guide")
+    columns_by_type, _ = _load_index(index_dir, doc_types)
+    rows: list[tuple[Any, ...]] = []
+    for doc_type in doc_types:
+        columns = columns_by_type[doc_type]
+        rows.extend(
+            zip(
+                columns["chunk_id"],
+                columns["content"],
+                columns["source_type"],
+                columns["reference_symbol_id"],
+                columns["provenance"],
+            )
+        )
+    return tuple(rows)
+
+
+def _pine_query_at(query: str, pine_version: str, mode: str, index_dir: Path) -> dict[str, Any]:
+    meta = _load_index_meta(index_dir)
 
-    enrichment = _load_enrichment(pine_version)
+    enrichment = None
     response_chunks = []
-    for chunk in filtered:
-        reference_symbol_id = chunk.get("reference_symbol_id")
+    for chunk_id, content, source_type, reference_symbol_id, provenance in _query_rows(
+        pine_version, mode, index_dir
+    ):
         enrichment_record = None
         if reference_symbol_id:
-            enrichment_record = enrichment.get(reference_symbol_id)
+            if enrichment is None:
+                enrichment = _load_enrichment(pine_version)
+            enrichment_record = copy.deepcopy(enrichment.get(reference_symbol_id))
         response_chunks.append(
             {
-                "chunk_id": chunk.get("chunk_id"),
-                "content": chunk.get("body"),
-                "source_type": chunk.get("doc_type"),
+                "chunk_id": chunk_id,
+                "content": content,
+                "source_type": source_type,
                 "reference_symbol_id": reference_symbol_id,
                 "enrichment": enrichment_record,
-                "provenance": _build_provenance(chunk),
+                "provenance": dict(provenance),
             }
         )
 
@@ -111,8 +191,8 @@ def pine_query(query: str, pine_version: str, mode: str) -> dict[str, Any]:
         "metadata": {
             "retrieval_version": meta.get("index_id", index_dir.name),
             "artifact_run_ids": {
-                "reference_run_ids": meta.get("reference_run_ids", []),
-                "guide_run_ids": meta.get("guide_run_ids", []),
+                "reference_run_ids": list(meta.get("reference_run_ids", [])),
+                "guide_run_ids": list(meta.get("guide_run_ids", [])),
             },
         },
     }
@@ -43,6 +43,17 @@ def parse_args() -> argparse.Namespace:
         default=1.0,
         help="Delay between requests.",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Concurrent fetch workers; crawler policy keeps this low.",
+    )
+    parser.add_argument(
+        "--verify-checksums",
+        action="store_true",
+        help="Rehash existing raw artifacts instead of trusting size and mtime.",
+    )
     return parser.parse_args()
 
 
@@ -62,6 +73,8 @@ def main() -> None:
         retries=args.retries,
         backoff_seconds=args.backoff_seconds,
         sleep_seconds=args.sleep_seconds,
+        workers=args.workers,
+        verify_checksums=args.verify_checksums,
     )
 
     print(f"attempted={counts['attempted']}")
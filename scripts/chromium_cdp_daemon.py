@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import argparse
+import signal
+import sys
+
+from playwright.sync_api import sync_playwright
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Run a shared headless Chromium exposing a CDP endpoint for renders."
+    )
+    parser.add_argument("--port", type=int, default=9222, help="Remote debugging port.")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    with sync_playwright() as p:
+        browser = p.chromium.launch(
+            headless=True,
+            args=[f"--remote-debugging-port={args.port}"],
+        )
+        print(f"PLAYWRIGHT_CDP_ENDPOINT=http://127.0.0.1:{args.port}", flush=True)
+        try:
+            signal.pause()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            browser.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -39,9 +39,12 @@ def main() -> None:
     }
     env_changed = any(value[0] != value[1] for value in env_delta.values())
     anchor_delta = candidate["anchor_count_total"] - baseline["anchor_count_total"]
-    prefix_delta = {}
-    for prefix, count in baseline["anchor_counts_by_prefix"].items():
-        prefix_delta[prefix] = candidate["anchor_counts_by_prefix"].get(prefix, 0) - count
+    baseline_counts = baseline["anchor_counts_by_prefix"]
+    candidate_counts = candidate["anchor_counts_by_prefix"]
+    prefix_delta = {
+        prefix: candidate_counts.get(prefix, 0) - baseline_counts.get(prefix, 0)
+        for prefix in sorted(baseline_counts.keys() | candidate_counts.keys())
+    }
 
     checksum_changed = baseline["artifact_checksum_sha256"] != candidate["artifact_checksum_sha256"]
     size_delta = candidate["artifact_size_bytes"] - baseline["artifact_size_bytes"]
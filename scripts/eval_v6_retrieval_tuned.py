@@ -1,10 +1,10 @@
 from __future__ import annotations
 
 import json
-import math
 import re
 from pathlib import Path
 
+import numpy as np
 from sentence_transformers import SentenceTransformer
 
 
@@ -15,9 +15,11 @@ DOC_TYPE_BOOST = 0.05
 SYMBOL_TYPE_BOOST = 0.05
 SECTION_PATH_BOOST = 0.03
 
+TOKEN_SPLIT_RE = re.compile(r"[^a-z0-9]+")
+
 
 def tokenize(text: str) -> list[str]:
-    return [token for token in re.split(r"[^a-z0-9]+", text.lower()) if token]
+    return [token for token in TOKEN_SPLIT_RE.split(text.lower()) if token]
 
 
 def detect_symbol_type_boost(query: str) -> set[str]:
@@ -32,34 +34,55 @@ def detect_symbol_type_boost(query: str) -> set[str]:
     return targets
 
 
-def section_path_boost(query_tokens: list[str], section_path: str | None) -> bool:
-    if not section_path:
-        return False
-    path_tokens = set(tokenize(section_path))
-    for token in query_tokens:
-        if token in path_tokens:
-            return True
-    return False
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    if len(scores) > k:
+        kth = np.argpartition(-scores, k - 1)[:k]
+        candidates = np.flatnonzero(scores >= scores[kth].min())
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind="stable")][:k]
 
 
 def main() -> None:
     root = Path(__file__).resolve().parent.parent
-    embeddings_path = (
-        root / "artifacts" / "embeddings" / "v6" / INDEX_ID / "embeddings.jsonl"
-    )
+    embeddings_dir = root / "artifacts" / "embeddings" / "v6" / INDEX_ID
+    embeddings_path = embeddings_dir / "embeddings.jsonl"
+    embeddings_meta = json.loads((embeddings_dir / "embeddings_meta.json").read_bytes())
     queries_path = root / "eval" / "v6" / "offline_queries.jsonl"
 
     model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
 
+    matrix = np.empty(
+        (embeddings_meta["chunk_count"], embeddings_meta["embedding_dim"]), dtype=np.float32
+    )
     embeddings = []
-    with embeddings_path.open("r", encoding="utf-8") as handle:
+    with embeddings_path.open("rb") as handle:
         for line in handle:
             if not line.strip():
                 continue
-            embeddings.append(json.loads(line))
-
-    vectors = [rec["embedding"] for rec in embeddings]
-    vec_norms = [math.sqrt(sum(v * v for v in vec)) for vec in vectors]
+            rec = json.loads(line)
+            if rec["pine_version"] != "v6":
+                continue
+            if len(embeddings) >= len(matrix):
+                raise ValueError("embedding_count_mismatch")
+            matrix[len(embeddings)] = rec.pop("embedding")
+            embeddings.append(rec)
+
+    matrix = matrix[: len(embeddings)]
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True).clip(min=1e-12)
+    doc_types = np.array([rec["doc_type"] for rec in embeddings])
+    symbol_types = np.array([rec.get("symbol_type") or "" for rec in embeddings])
+    is_reference = doc_types == "reference"
+    is_guide = doc_types == "guide"
+    doc_type_boosts = {
+        doc_type: DOC_TYPE_BOOST * (doc_types == doc_type) for doc_type in set(doc_types.tolist())
+    }
+    symbol_type_boosts: dict[frozenset[str], np.ndarray] = {}
+    section_path_rows: dict[str, list[int]] = {}
+    for row, (guide, rec) in enumerate(zip(is_guide, embeddings)):
+        if guide:
+            for token in set(tokenize(rec.get("section_path") or "")):
+                section_path_rows.setdefault(token, []).append(row)
 
     queries = []
     with queries_path.open("r", encoding="utf-8") as handle:
@@ -68,41 +91,40 @@ def main() -> None:
                 continue
             queries.append(json.loads(line))
 
+    if queries:
+        query_matrix = model.encode(
+            [q["query"] for q in queries],
+            batch_size=64,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False,
+        ).astype(np.float32)
+    else:
+        query_matrix = np.empty((0, matrix.shape[1]), dtype=np.float32)
+    similarity = query_matrix @ matrix.T
+
     hits = 0
     precision_sum = 0.0
 
-    for q in queries:
+    for q, scores in zip(queries, similarity):
         qtext = q["query"]
-        qvec = model.encode(qtext, normalize_embeddings=False).tolist()
-        qnorm = math.sqrt(sum(v * v for v in qvec)) or 1.0
-        qtokens = tokenize(qtext)
+        qtokens = frozenset(tokenize(qtext))
         symbol_boost_targets = detect_symbol_type_boost(qtext)
 
-        scores = []
-        for idx, rec in enumerate(embeddings):
-            if rec["pine_version"] != "v6":
-                continue
-            dot = sum(a * b for a, b in zip(qvec, vectors[idx]))
-            denom = qnorm * (vec_norms[idx] or 1.0)
-            sim = dot / denom
-            score = sim
-
-            if rec["doc_type"] == q["expected_doc_type"]:
-                score += DOC_TYPE_BOOST
-
-            if rec["doc_type"] == "reference" and symbol_boost_targets:
-                symbol_type = rec.get("symbol_type")
-                if symbol_type in symbol_boost_targets:
-                    score += SYMBOL_TYPE_BOOST
-
-            if rec["doc_type"] == "guide":
-                if section_path_boost(qtokens, rec.get("section_path")):
-                    score += SECTION_PATH_BOOST
-
-            scores.append((score, rec))
-
-        scores.sort(key=lambda item: item[0], reverse=True)
-        top = scores[:TOP_K]
+        if q["expected_doc_type"] in doc_type_boosts:
+            scores += doc_type_boosts[q["expected_doc_type"]]
+        if symbol_boost_targets:
+            targets = frozenset(symbol_boost_targets)
+            if targets not in symbol_type_boosts:
+                symbol_match = np.isin(symbol_types, sorted(targets))
+                symbol_type_boosts[targets] = SYMBOL_TYPE_BOOST * (is_reference & symbol_match)
+            scores += symbol_type_boosts[targets]
+        section_match = np.zeros(len(embeddings), dtype=bool)
+        for token in qtokens:
+            section_match[section_path_rows.get(token, [])] = True
+        scores += SECTION_PATH_BOOST * section_match
+
+        top = [embeddings[idx] for idx in top_k_indices(scores, TOP_K)]
 
         expected_doc_type = q["expected_doc_type"]
         expected_url_contains = q["expected_canonical_url_contains"]
@@ -110,11 +132,11 @@ def main() -> None:
         hit = any(
             rec["doc_type"] == expected_doc_type
             and expected_url_contains in rec["canonical_url"]
-            for _, rec in top
+            for rec in top
         )
         hits += 1 if hit else 0
 
-        doc_type_matches = sum(1 for _, rec in top if rec["doc_type"] == expected_doc_type)
+        doc_type_matches = sum(1 for rec in top if rec["doc_type"] == expected_doc_type)
         precision_sum += doc_type_matches / TOP_K
 
     hit_rate = hits / len(queries) if queries else 0.0
@@ -4,7 +4,6 @@ import json
 import os
 import sys
 from datetime import datetime, timezone
-from pathlib import Path
 
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 SRC_PATH = os.path.join(PROJECT_ROOT, "src")
@@ -21,105 +20,77 @@ from tradingview_ingest.rendered_reference import (
     read_manifest,
     render_reference,
     segment_reference_html,
-    sha256_hex,
     utc_now_iso,
+    write_html,
     write_jsonl,
     write_manifest,
 )
 
+JSON_ENCODER = json.JSONEncoder(sort_keys=True)
+REFERENCE_RENDER_DIR = os.path.join(PROJECT_ROOT, "raw", "rendered", "v6", "reference")
+ACQUISITION_LOG_DIR = os.path.join(PROJECT_ROOT, "artifacts", "acquisition_runs", "v6")
+SEGMENT_LOG_DIR = os.path.join(PROJECT_ROOT, "artifacts", "segmentation_runs", "v6")
+SEGMENT_OUTPUT_DIR = os.path.join(PROJECT_ROOT, "artifacts", "segments", "v6")
+DRIFT_REPORT_DIR = os.path.join(PROJECT_ROOT, "artifacts", "drift_reports", "v6")
+
 
 def run_id_now() -> str:
     return datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
 
 
 def manifest_path(run_id: str) -> str:
-    return os.path.join(
-        PROJECT_ROOT,
-        "raw",
-        "rendered",
-        "v6",
-        "reference",
-        run_id,
-        "manifest.json",
-    )
+    return os.path.join(REFERENCE_RENDER_DIR, run_id, "manifest.json")
 
 
 def reference_html_path(run_id: str) -> str:
-    return os.path.join(
-        PROJECT_ROOT,
-        "raw",
-        "rendered",
-        "v6",
-        "reference",
-        run_id,
-        "reference.html",
-    )
+    return os.path.join(REFERENCE_RENDER_DIR, run_id, "reference.html")
 
 
 def acquisition_log_path(run_id: str) -> str:
-    return os.path.join(
-        PROJECT_ROOT,
-        "artifacts",
-        "acquisition_runs",
-        "v6",
-        f"{run_id}.jsonl",
-    )
+    return os.path.join(ACQUISITION_LOG_DIR, f"{run_id}.jsonl")
 
 
 def segment_log_path(run_id: str) -> str:
-    return os.path.join(
-        PROJECT_ROOT,
-        "artifacts",
-        "segmentation_runs",
-        "v6",
-        f"{run_id}.jsonl",
-    )
+    return os.path.join(SEGMENT_LOG_DIR, f"{run_id}.jsonl")
 
 
 def segment_output_path(run_id: str) -> str:
-    return os.path.join(
-        PROJECT_ROOT,
-        "artifacts",
-        "segments",
-        "v6",
-        f"{run_id}.jsonl",
-    )
+    return os.path.join(SEGMENT_OUTPUT_DIR, f"{run_id}.jsonl")
 
 
 def drift_report_path(baseline: str, candidate: str) -> str:
-    return os.path.join(
-        PROJECT_ROOT,
-        "artifacts",
-        "drift_reports",
-        "v6",
-        f"{baseline}__{candidate}.json",
-    )
+    return os.path.join(DRIFT_REPORT_DIR, f"{baseline}__{candidate}.json")
+
+
+def manifest_run_ids() -> list[str]:
+    if not os.path.isdir(REFERENCE_RENDER_DIR):
+        return []
+    with os.scandir(REFERENCE_RENDER_DIR) as entries:
+        return sorted(
+            entry.name
+            for entry in entries
+            if entry.is_dir()
+            and os.path.isfile(os.path.join(entry.path, "manifest.json"))
+        )
 
 
 def latest_manifest(run_id: str | None = None) -> str | None:
-    base = Path(PROJECT_ROOT) / "raw" / "rendered" / "v6" / "reference"
-    if not base.exists():
-        return None
-    manifests = sorted(base.glob("*/manifest.json"))
-    if not manifests:
+    run_ids = manifest_run_ids()
+    if not run_ids:
         return None
-    if run_id:
-        for manifest in manifests:
-            if manifest.parent.name == run_id:
-                return str(manifest)
-    return str(manifests[-1])
+    if run_id and run_id in run_ids:
+        return manifest_path(run_id)
+    return manifest_path(run_ids[-1])
 
 
 def previous_manifest(current_run_id: str) -> str | None:
-    base = Path(PROJECT_ROOT) / "raw" / "rendered" / "v6" / "reference"
-    manifests = sorted(base.glob("*/manifest.json"))
-    if len(manifests) < 2:
+    run_ids = manifest_run_ids()
+    if current_run_id not in run_ids:
         return None
-    manifests_sorted = sorted(manifests, key=lambda item: item.parent.name)
-    for idx, manifest in enumerate(manifests_sorted):
-        if manifest.parent.name == current_run_id and idx > 0:
-            return str(manifests_sorted[idx - 1])
-    return None
+    idx = run_ids.index(current_run_id)
+    if idx == 0:
+        return None
+    return manifest_path(run_ids[idx - 1])
 
 
 def render_and_manifest(run_id: str) -> dict:
@@ -140,11 +111,7 @@ def render_and_manifest(run_id: str) -> dict:
     result = render_reference(REFERENCE_URL, config)
     html_path = reference_html_path(run_id)
     os.makedirs(os.path.dirname(html_path), exist_ok=True)
-    html_bytes = result.html.encode("utf-8")
-    with open(html_path, "wb") as handle:
-        handle.write(html_bytes)
-
-    checksum = sha256_hex(html_bytes)
+    size_bytes, checksum = write_html(html_path, result.html)
     manifest = {
         "manifest_version": "1.0",
         "canonical_url": REFERENCE_URL,
@@ -166,7 +133,7 @@ def render_and_manifest(run_id: str) -> dict:
         "anchor_count_total": len(result.anchor_ids),
         "anchor_counts_by_prefix": result.anchor_counts_by_prefix,
         "artifact_path": os.path.relpath(html_path, PROJECT_ROOT),
-        "artifact_size_bytes": len(html_bytes),
+        "artifact_size_bytes": size_bytes,
         "artifact_checksum_sha256": checksum,
         "status": result.status,
         "notes": result.notes,
@@ -190,7 +157,8 @@ def segment_reference(run_id: str, manifest: dict) -> None:
         raise SystemExit("render_incomplete")
 
     html_path = os.path.join(PROJECT_ROOT, manifest["artifact_path"])
-    html = open(html_path, "r", encoding="utf-8").read()
+    with open(html_path, "r", encoding="utf-8") as handle:
+        html = handle.read()
     segments, qc = segment_reference_html(
         html=html,
         canonical_url=manifest["canonical_url"],
@@ -241,9 +209,9 @@ def segment_reference(run_id: str, manifest: dict) -> None:
     output_path = segment_output_path(run_id)
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
     with open(output_path, "a", encoding="utf-8") as handle:
-        for segment in segments:
-            handle.write(json.dumps(segment, sort_keys=True))
-            handle.write("\n")
+        handle.write(
+            "".join(JSON_ENCODER.encode(segment) + "\n" for segment in segments)
+        )
 
     write_jsonl(
         segment_log_path(run_id),
@@ -270,9 +238,12 @@ def generate_drift_report(baseline_manifest: dict, candidate_manifest: dict) ->
     }
     env_changed = any(value[0] != value[1] for value in env_delta.values())
     anchor_delta = candidate_manifest["anchor_count_total"] - baseline_manifest["anchor_count_total"]
-    prefix_delta = {}
-    for prefix, count in baseline_manifest["anchor_counts_by_prefix"].items():
-        prefix_delta[prefix] = candidate_manifest["anchor_counts_by_prefix"].get(prefix, 0) - count
+    baseline_counts = baseline_manifest["anchor_counts_by_prefix"]
+    candidate_counts = candidate_manifest["anchor_counts_by_prefix"]
+    prefix_delta = {
+        prefix: candidate_counts.get(prefix, 0) - baseline_counts.get(prefix, 0)
+        for prefix in sorted(baseline_counts.keys() | candidate_counts.keys())
+    }
 
     checksum_changed = (
         baseline_manifest["artifact_checksum_sha256"]
@@ -300,11 +271,11 @@ def generate_drift_report(baseline_manifest: dict, candidate_manifest: dict) ->
 def main() -> None:
     ensure_directories(
         [
-            os.path.join(PROJECT_ROOT, "raw", "rendered", "v6", "reference"),
-            os.path.join(PROJECT_ROOT, "artifacts", "acquisition_runs", "v6"),
-            os.path.join(PROJECT_ROOT, "artifacts", "segmentation_runs", "v6"),
-            os.path.join(PROJECT_ROOT, "artifacts", "segments", "v6"),
-            os.path.join(PROJECT_ROOT, "artifacts", "drift_reports", "v6"),
+            REFERENCE_RENDER_DIR,
+            ACQUISITION_LOG_DIR,
+            SEGMENT_LOG_DIR,
+            SEGMENT_OUTPUT_DIR,
+            DRIFT_REPORT_DIR,
         ]
     )
 
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import argparse
 import os
 import sys
 
@@ -11,8 +12,22 @@ if SRC_PATH not in sys.path:
 from tradingview_ingest.normalization import normalize_guides
 
 
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Normalize v5 guide segments.")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Processes used to decode fallback guide pages.",
+    )
+    return parser.parse_args()
+
+
 def main() -> None:
-    pages_written, sections_written, fallback_count, warnings = normalize_guides(PROJECT_ROOT)
+    args = parse_args()
+    pages_written, sections_written, fallback_count, warnings = normalize_guides(
+        PROJECT_ROOT, workers=args.workers
+    )
     print(f"guide_pages_written={pages_written}")
     print(f"guide_sections_written={sections_written}")
     print(f"fallback_sections={fallback_count}")
@@ -3,6 +3,10 @@ from __future__ import annotations
 import json
 from pathlib import Path
 
+READ_BUFFER_SIZE = 1 << 20
+WRITE_BUFFER_SIZE = 1 << 20
+JSON_ENCODER = json.JSONEncoder(sort_keys=True)
+
 
 def main() -> None:
     run_id = "20260109T135601Z"
@@ -12,7 +16,11 @@ def main() -> None:
     )
     output_path = root / "normalized" / "v6" / "guide_sections.jsonl"
 
-    if output_path.exists() and output_path.stat().st_size > 0:
+    try:
+        output_size = output_path.stat().st_size
+    except FileNotFoundError:
+        output_size = 0
+    if output_size > 0:
         raise SystemExit(f"output_exists:{output_path}")
 
     output_path.parent.mkdir(parents=True, exist_ok=True)
@@ -21,9 +29,10 @@ def main() -> None:
     written = 0
     sample_ids: list[str] = []
 
-    with segments_path.open("r", encoding="utf-8") as source, output_path.open(
-        "a", encoding="utf-8"
-    ) as target:
+    with (
+        segments_path.open("rb", buffering=READ_BUFFER_SIZE) as source,
+        output_path.open("a", encoding="utf-8", buffering=WRITE_BUFFER_SIZE) as target,
+    ):
         for line in source:
             if not line.strip():
                 continue
@@ -70,8 +79,7 @@ def main() -> None:
             if len(sample_ids) < 5:
                 sample_ids.append(guide_section_id)
 
-            target.write(json.dumps(record, sort_keys=True))
-            target.write("\n")
+            target.write(JSON_ENCODER.encode(record) + "\n")
             written += 1
 
     print(f"output={output_path}")
@@ -3,31 +3,50 @@ from __future__ import annotations
 import os
 from pathlib import Path
 
-from playwright.sync_api import sync_playwright
+from playwright.sync_api import Browser, Playwright, sync_playwright
 
 
 URL = "https://www.tradingview.com/pine-script-reference/v6/"
 OUTPUT_PATH = Path("raw/rendered/v6/reference/manual_baseline/reference.html")
+SCROLL_PASSES = 5
+SETTLE_MS = 2000
+SCROLL_SETTLE_MS = 1500
+
+
+def warm_browser(playwright: Playwright) -> Browser:
+    endpoint = os.environ.get("PLAYWRIGHT_CDP_ENDPOINT")
+    if endpoint:
+        return playwright.chromium.connect_over_cdp(endpoint)
+    return playwright.chromium.launch(headless=True)
+
+
+def render(browser: Browser, url: str) -> str:
+    context = browser.new_context(
+        viewport={"width": 1440, "height": 900},
+        locale="en-US",
+        timezone_id="UTC",
+        user_agent="PineScript-Builder CI renderer/0.1",
+    )
+    try:
+        page = context.new_page()
+        page.goto(url, wait_until="domcontentloaded", timeout=120000)
+        page.wait_for_timeout(SETTLE_MS)
+        for _ in range(SCROLL_PASSES):
+            page.evaluate("window.scrollTo(0, document.body.scrollHeight);")
+            page.wait_for_timeout(SCROLL_SETTLE_MS)
+        return page.content()
+    finally:
+        context.close()
 
 
 def main() -> None:
     OUTPUT_PATH.parent.mkdir(parents=True, exist_ok=True)
     with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context(
-            viewport={"width": 1440, "height": 900},
-            locale="en-US",
-            timezone_id="UTC",
-            user_agent="PineScript-Builder CI renderer/0.1",
-        )
-        page = context.new_page()
-        page.goto(URL, wait_until="domcontentloaded", timeout=120000)
-        page.wait_for_timeout(2000)
-        for _ in range(5):
-            page.evaluate("window.scrollTo(0, document.body.scrollHeight);")
-            page.wait_for_timeout(1500)
-        html = page.content()
-        browser.close()
+        browser = warm_browser(p)
+        try:
+            html = render(browser, URL)
+        finally:
+            browser.close()
 
     OUTPUT_PATH.write_text(html, encoding="utf-8")
 
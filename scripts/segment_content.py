@@ -3,6 +3,8 @@ from __future__ import annotations
 import argparse
 import os
 import sys
+from collections import Counter
+from collections.abc import Iterable, Iterator
 from datetime import datetime, timezone
 
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
@@ -10,7 +12,13 @@ SRC_PATH = os.path.join(PROJECT_ROOT, "src")
 if SRC_PATH not in sys.path:
     sys.path.insert(0, SRC_PATH)
 
-from tradingview_ingest.segmentation import segment_artifacts, write_failures, write_segments
+from tradingview_ingest.segmentation import (
+    Failure,
+    Segment,
+    iter_segments,
+    write_failures,
+    write_segments,
+)
 
 
 def parse_args() -> argparse.Namespace:
@@ -30,6 +38,18 @@ def parse_args() -> argparse.Namespace:
         default=None,
         help="Output JSONL path for failures.",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Processes used to parse artifacts.",
+    )
+    parser.add_argument(
+        "--strict",
+        action="store_true",
+        default=os.environ.get("SEGMENT_STRICT", "").lower() in {"1", "true", "yes"},
+        help="Stop at the first reference failure (also set by SEGMENT_STRICT=1).",
+    )
     return parser.parse_args()
 
 
@@ -40,6 +60,14 @@ def build_paths(root: str) -> tuple[str, str]:
     return segments_out, failures_out
 
 
+def count_doc_types(
+    segments: Iterable[Segment], counts: Counter[str]
+) -> Iterator[Segment]:
+    for segment in segments:
+        counts[segment.doc_type] += 1
+        yield segment
+
+
 def main() -> None:
     args = parse_args()
     segments_out, failures_out = build_paths(PROJECT_ROOT)
@@ -48,19 +76,24 @@ def main() -> None:
     if args.failures_out:
         failures_out = args.failures_out
 
-    segments, failures = segment_artifacts(os.path.join(PROJECT_ROOT, args.raw_root))
-    write_segments(segments_out, segments)
+    failures: list[Failure] = []
+    counts: Counter[str] = Counter()
+    segments = iter_segments(
+        os.path.join(PROJECT_ROOT, args.raw_root),
+        failures,
+        workers=args.workers,
+        strict=args.strict,
+    )
+    write_segments(segments_out, count_doc_types(segments, counts))
     write_failures(failures_out, failures)
 
     reference_failed = any(
         failure.doc_type == "reference" for failure in failures
     )
 
-    guide_count = sum(1 for segment in segments if segment.doc_type == "guide")
-    reference_count = sum(1 for segment in segments if segment.doc_type == "reference")
-    print(f"segments_total={len(segments)}")
-    print(f"segments_guide={guide_count}")
-    print(f"segments_reference={reference_count}")
+    print(f"segments_total={sum(counts.values())}")
+    print(f"segments_guide={counts['guide']}")
+    print(f"segments_reference={counts['reference']}")
     print(f"failures={len(failures)}")
     print(f"segments_out={segments_out}")
     print(f"failures_out={failures_out}")
@@ -4,9 +4,13 @@ import hashlib
 import json
 import os
 import time
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import Iterable
+from http.client import HTTPResponse
+from operator import attrgetter
+from typing import IO, Iterable, Iterator
 from urllib.parse import urlparse
 from urllib.request import Request, urlopen
 
@@ -14,6 +18,12 @@ from urllib.request import Request, urlopen
 USER_AGENT = "PineScript-Builder acquisition/0.1"
 ACCEPT_ENCODING = "gzip"
 DEFAULT_TIMEOUT = 20
+STREAM_CHUNK_BYTES = 1 << 20
+LOG_BUFFER_BYTES = 1 << 20
+INDENTED_JSON_ENCODER = json.JSONEncoder(indent=2, sort_keys=True)
+ISO_UTC_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
+
+_CREATED_DIRS: set[str] = set()
 
 
 @dataclass(frozen=True)
@@ -32,7 +42,9 @@ class FetchResult:
     status: int
     content_type: str | None
     content_encoding: str | None
-    raw_bytes: bytes
+    part_path: str
+    checksum: str
+    raw_size: int
     decoded_length: int | None
 
 
@@ -45,40 +57,84 @@ class FailureRecord:
 
 
 def utc_now_iso() -> str:
-    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+    return datetime.now(timezone.utc).strftime(ISO_UTC_FORMAT)
 
 
 def sha256_hex(data: bytes) -> str:
     return hashlib.sha256(data).hexdigest()
 
 
+def _sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(STREAM_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
 def url_hash(url: str) -> str:
     return sha256_hex(url.encode("utf-8"))
 
 
 def safe_makedirs(path: str) -> None:
+    if path in _CREATED_DIRS:
+        return
     os.makedirs(path, exist_ok=True)
+    _CREATED_DIRS.add(path)
 
 
 def load_inventory(path: str) -> list[InventoryItem]:
-    raw = json.loads(open(path, "r", encoding="utf-8").read())
-    items: list[InventoryItem] = []
-    for entry in raw:
-        items.append(
-            InventoryItem(
-                canonical_url=entry["canonical_url"],
-                doc_type=entry["doc_type"],
-                pine_version=entry["pine_version"],
-                source_entry_point=entry.get("source_entry_point", ""),
-                discovered_at=entry.get("discovered_at", ""),
-                discovery_method=entry.get("discovery_method", ""),
-                segmentation_strategy=entry.get("segmentation_strategy"),
-            )
+    with open(path, "rb") as handle:
+        raw = json.load(handle)
+    items = [
+        InventoryItem(
+            canonical_url=entry["canonical_url"],
+            doc_type=entry["doc_type"],
+            pine_version=entry["pine_version"],
+            source_entry_point=entry.get("source_entry_point", ""),
+            discovered_at=entry.get("discovered_at", ""),
+            discovery_method=entry.get("discovery_method", ""),
+            segmentation_strategy=entry.get("segmentation_strategy"),
         )
-    return sorted(items, key=lambda item: item.canonical_url)
+        for entry in raw
+    ]
+    items.sort(key=attrgetter("canonical_url"))
+    return items
+
+
+def _read_chunks(handle: IO[bytes]) -> Iterator[bytes]:
+    return iter(lambda: handle.read(STREAM_CHUNK_BYTES), b"")
+
+
+def gzip_decoded_length(chunks: Iterable[bytes]) -> int | None:
+    length = 0
+    decompressor = None
+    after_member = False
+    try:
+        for data in chunks:
+            output = b""
+            while data or output:
+                if decompressor is None:
+                    if after_member:
+                        data = data.lstrip(b"\x00")
+                    if not data:
+                        break
+                    decompressor = zlib.decompressobj(wbits=31)
+                output = decompressor.decompress(data, STREAM_CHUNK_BYTES)
+                length += len(output)
+                data = decompressor.unconsumed_tail
+                if decompressor.eof:
+                    data = decompressor.unused_data
+                    decompressor = None
+                    after_member = True
+    except zlib.error:
+        return None
+    if decompressor is not None:
+        return None
+    return length
 
 
-def fetch_bytes(url: str, timeout: int = DEFAULT_TIMEOUT) -> FetchResult:
+def open_url(url: str, timeout: int = DEFAULT_TIMEOUT) -> HTTPResponse:
     request = Request(
         url,
         headers={
@@ -86,35 +142,53 @@ def fetch_bytes(url: str, timeout: int = DEFAULT_TIMEOUT) -> FetchResult:
             "Accept-Encoding": ACCEPT_ENCODING,
         },
     )
-    with urlopen(request, timeout=timeout) as response:
+    return urlopen(request, timeout=timeout)
+
+
+def fetch_to_file(
+    url: str, part_path: str, timeout: int = DEFAULT_TIMEOUT
+) -> FetchResult:
+    digest = hashlib.sha256()
+    with open_url(url, timeout=timeout) as response:
         status = int(getattr(response, "status", 0) or 0)
         content_type = response.headers.get("Content-Type")
         content_encoding = response.headers.get("Content-Encoding")
-        payload = response.read()
-    decoded_length = None
-    if content_encoding and "gzip" in content_encoding.lower():
         try:
-            import gzip
-
-            decoded_length = len(gzip.decompress(payload))
-        except Exception:
-            decoded_length = None
+            with open(part_path, "wb") as handle:
+                for chunk in _read_chunks(response):
+                    handle.write(chunk)
+                    digest.update(chunk)
+        except BaseException:
+            os.remove(part_path)
+            raise
+    raw_size = os.path.getsize(part_path)
+    if content_encoding and "gzip" in content_encoding.lower():
+        with open(part_path, "rb") as handle:
+            decoded_length = gzip_decoded_length(_read_chunks(handle))
     else:
-        decoded_length = len(payload)
+        decoded_length = raw_size
     return FetchResult(
         status=status,
         content_type=content_type,
         content_encoding=content_encoding,
-        raw_bytes=payload,
+        part_path=part_path,
+        checksum=digest.hexdigest(),
+        raw_size=raw_size,
         decoded_length=decoded_length,
     )
 
 
-def fetch_with_retries(url: str, retries: int, backoff_seconds: float) -> FetchResult:
+def discard_fetch(result: FetchResult) -> None:
+    os.remove(result.part_path)
+
+
+def fetch_with_retries(
+    url: str, part_path: str, retries: int, backoff_seconds: float
+) -> FetchResult:
     attempt = 0
     while True:
         try:
-            return fetch_bytes(url)
+            return fetch_to_file(url, part_path)
         except Exception:
             attempt += 1
             if attempt > retries:
@@ -123,11 +197,10 @@ def fetch_with_retries(url: str, retries: int, backoff_seconds: float) -> FetchR
 
 
 def fetch_robots_txt(host: str) -> str:
-    robots_url = f"{host}/robots.txt"
-    result = fetch_bytes(robots_url)
-    if result.status != 200:
-        return ""
-    return result.raw_bytes.decode("utf-8", errors="replace")
+    with open_url(f"{host}/robots.txt") as response:
+        if int(getattr(response, "status", 0) or 0) != 200:
+            return ""
+        return response.read().decode("utf-8", errors="replace")
 
 
 def parse_robots_disallow(robots_txt: str) -> list[str]:
@@ -149,12 +222,8 @@ def parse_robots_disallow(robots_txt: str) -> list[str]:
     return disallow
 
 
-def is_allowed_by_robots(url: str, disallow_paths: Iterable[str]) -> bool:
-    path = urlparse(url).path or "/"
-    for disallow in disallow_paths:
-        if path.startswith(disallow):
-            return False
-    return True
+def is_allowed_by_robots(url: str, disallow_paths: tuple[str, ...]) -> bool:
+    return not (urlparse(url).path or "/").startswith(disallow_paths)
 
 
 def artifact_paths(
@@ -171,28 +240,53 @@ def artifact_paths(
     return raw_path, meta_path
 
 
-def existing_checksum(meta_path: str, raw_path: str) -> str | None:
-    if not os.path.exists(meta_path) or not os.path.exists(raw_path):
+def existing_checksum(
+    meta_path: str, raw_path: str, verify: bool = False
+) -> str | None:
+    try:
+        meta_stat = os.stat(meta_path)
+        raw_stat = os.stat(raw_path)
+    except OSError:
         return None
     try:
-        meta = json.loads(open(meta_path, "r", encoding="utf-8").read())
+        with open(meta_path, "rb") as handle:
+            meta = json.load(handle)
     except Exception:
         return None
     expected = meta.get("checksum")
     if not expected:
         return None
-    actual = sha256_hex(open(raw_path, "rb").read())
+    if (
+        not verify
+        and meta.get("raw_size") == raw_stat.st_size
+        and meta_stat.st_mtime_ns >= raw_stat.st_mtime_ns
+    ):
+        return expected
+    actual = _sha256_file(raw_path)
     if actual != expected:
         return None
     return expected
 
 
-def write_raw_and_meta(
-    raw_path: str, meta_path: str, item: InventoryItem, result: FetchResult, run_id: str
+def publish_raw(part_path: str, raw_path: str) -> bool:
+    try:
+        os.link(part_path, raw_path)
+    except FileExistsError:
+        return False
+    except OSError:
+        try:
+            os.close(os.open(raw_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            return False
+        os.replace(part_path, raw_path)
+        return True
+    os.remove(part_path)
+    return True
+
+
+def write_meta(
+    meta_path: str, item: InventoryItem, result: FetchResult, run_id: str
 ) -> None:
-    with open(raw_path, "wb") as handle:
-        handle.write(result.raw_bytes)
-    checksum = sha256_hex(result.raw_bytes)
     meta = {
         "canonical_url": item.canonical_url,
         "doc_type": item.doc_type,
@@ -206,12 +300,31 @@ def write_raw_and_meta(
         "content_type": result.content_type,
         "content_length": result.decoded_length,
         "content_encoding": result.content_encoding,
-        "checksum": checksum,
+        "checksum": result.checksum,
+        "raw_size": result.raw_size,
         "acquisition_run_id": run_id,
     }
     with open(meta_path, "w", encoding="utf-8") as handle:
-        json.dump(meta, handle, indent=2, sort_keys=True)
-        handle.write("\n")
+        handle.write(INDENTED_JSON_ENCODER.encode(meta) + "\n")
+
+
+def write_failure(handle: IO[bytes], item: InventoryItem, reason: str) -> None:
+    record = FailureRecord(
+        canonical_url=item.canonical_url,
+        doc_type=item.doc_type,
+        pine_version=item.pine_version,
+        reason=reason,
+    )
+    handle.write(json.dumps(record.__dict__).encode("utf-8") + b"\n")
+
+
+def paced_fetch(
+    url: str, part_path: str, retries: int, backoff_seconds: float, sleep_seconds: float
+) -> FetchResult:
+    try:
+        return fetch_with_retries(url, part_path, retries, backoff_seconds)
+    finally:
+        time.sleep(sleep_seconds)
 
 
 def acquire_inventory(
@@ -221,10 +334,14 @@ def acquire_inventory(
     retries: int,
     backoff_seconds: float,
     sleep_seconds: float,
+    workers: int = 1,
+    verify_checksums: bool = False,
 ) -> dict[str, int]:
+    if workers < 1:
+        raise ValueError(f"invalid_workers:{workers}")
     host = "https://www.tradingview.com"
     robots_txt = fetch_robots_txt(host)
-    disallow_paths = parse_robots_disallow(robots_txt)
+    disallow_paths = tuple(parse_robots_disallow(robots_txt))
     run_id = os.path.basename(run_log_path).split(".")[0]
     safe_makedirs(os.path.dirname(run_log_path))
 
@@ -236,67 +353,84 @@ def acquire_inventory(
         "failed_reference": 0,
     }
 
-    with open(run_log_path, "w", encoding="utf-8") as log_handle:
-        for item in inventory:
-            counts["attempted"] += 1
-            if not is_allowed_by_robots(item.canonical_url, disallow_paths):
-                record = FailureRecord(
-                    canonical_url=item.canonical_url,
-                    doc_type=item.doc_type,
-                    pine_version=item.pine_version,
-                    reason="robots_disallow",
-                )
-                log_handle.write(json.dumps(record.__dict__) + "\n")
-                if item.doc_type == "reference":
-                    counts["failed_reference"] += 1
-                    break
-                counts["failed_guide"] += 1
-                continue
-
-            raw_path, meta_path = artifact_paths(output_root, item)
-            existing = existing_checksum(meta_path, raw_path)
-            if existing:
-                counts["skipped"] += 1
-                continue
-
-            try:
-                result = fetch_with_retries(item.canonical_url, retries, backoff_seconds)
-            except Exception:
-                record = FailureRecord(
-                    canonical_url=item.canonical_url,
-                    doc_type=item.doc_type,
-                    pine_version=item.pine_version,
-                    reason="fetch_error",
-                )
-                log_handle.write(json.dumps(record.__dict__) + "\n")
-                if item.doc_type == "reference":
-                    counts["failed_reference"] += 1
-                    break
-                counts["failed_guide"] += 1
-                continue
-
-            if result.status < 200 or result.status >= 300:
-                record = FailureRecord(
-                    canonical_url=item.canonical_url,
-                    doc_type=item.doc_type,
-                    pine_version=item.pine_version,
-                    reason=f"http_{result.status}",
+    plans: list[tuple[bool, str, str, str | None]] = []
+    fetches: dict[int, Future[FetchResult]] = {}
+
+    with (
+        ThreadPoolExecutor(max_workers=workers) as executor,
+        open(run_log_path, "wb", buffering=LOG_BUFFER_BYTES) as log_handle,
+    ):
+        try:
+            for index, item in enumerate(inventory):
+                while len(plans) < min(len(inventory), index + workers):
+                    ahead = inventory[len(plans)]
+                    allowed = is_allowed_by_robots(ahead.canonical_url, disallow_paths)
+                    raw_path, meta_path = artifact_paths(output_root, ahead)
+                    existing = None
+                    if allowed:
+                        existing = existing_checksum(
+                            meta_path, raw_path, verify_checksums
+                        )
+                    if allowed and not existing:
+                        fetches[len(plans)] = executor.submit(
+                            paced_fetch,
+                            ahead.canonical_url,
+                            f"{raw_path}.{len(plans)}.part",
+                            retries,
+                            backoff_seconds,
+                            sleep_seconds,
+                        )
+                    plans.append((allowed, raw_path, meta_path, existing))
+
+                counts["attempted"] += 1
+                allowed, raw_path, meta_path, existing = plans[index]
+                if not allowed:
+                    write_failure(log_handle, item, "robots_disallow")
+                    if item.doc_type == "reference":
+                        counts["failed_reference"] += 1
+                        break
+                    counts["failed_guide"] += 1
+                    continue
+
+                if existing:
+                    counts["skipped"] += 1
+                    continue
+
+                try:
+                    result = fetches.pop(index).result()
+                except Exception:
+                    write_failure(log_handle, item, "fetch_error")
+                    if item.doc_type == "reference":
+                        counts["failed_reference"] += 1
+                        break
+                    counts["failed_guide"] += 1
+                    continue
+
+                if result.status < 200 or result.status >= 300:
+                    discard_fetch(result)
+                    write_failure(log_handle, item, f"http_{result.status}")
+                    if item.doc_type == "reference":
+                        counts["failed_reference"] += 1
+                        break
+                    counts["failed_guide"] += 1
+                    continue
+
+                published = not os.path.exists(meta_path) and publish_raw(
+                    result.part_path, raw_path
                 )
-                log_handle.write(json.dumps(record.__dict__) + "\n")
-                if item.doc_type == "reference":
-                    counts["failed_reference"] += 1
-                    break
-                counts["failed_guide"] += 1
-                continue
-
-            suffix = None
-            if os.path.exists(raw_path) or os.path.exists(meta_path):
-                suffix = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
-                raw_path, meta_path = artifact_paths(output_root, item, suffix)
-
-            write_raw_and_meta(raw_path, meta_path, item, result, run_id)
-            counts["written"] += 1
-
-            time.sleep(sleep_seconds)
+                if not published:
+                    suffix = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+                    raw_path, meta_path = artifact_paths(output_root, item, suffix)
+                    os.replace(result.part_path, raw_path)
+
+                write_meta(meta_path, item, result, run_id)
+                counts["written"] += 1
+        finally:
+            for future in fetches.values():
+                future.cancel()
+            executor.shutdown(wait=True)
+            for future in fetches.values():
+                if not future.cancelled() and future.exception() is None:
+                    discard_fetch(future.result())
 
     return counts
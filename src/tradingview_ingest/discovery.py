@@ -1,15 +1,20 @@
 from __future__ import annotations
 
+import functools
 import gzip
+import io
 import json
 import re
 import xml.etree.ElementTree as ET
 from dataclasses import dataclass
 from datetime import datetime, timezone
-from html.parser import HTMLParser
+from operator import attrgetter
 from typing import Iterable
 from urllib.parse import urljoin, urlparse, urlunparse
 
+import lxml.html
+from lxml.etree import ParserError
+
 
 EXCLUDED_PATH_SEGMENTS = (
     "/blog/",
@@ -23,9 +28,20 @@ EXCLUDED_PATH_SEGMENTS = (
     "/login/",
 )
 
+EXCLUDED_PATH_RE = re.compile(
+    "/(?:" + "|".join(segment.strip("/") for segment in EXCLUDED_PATH_SEGMENTS) + ")/"
+)
+
+CANONICAL_ORIGIN = "https://www.tradingview.com"
+URL_SPLIT_CHARS = "?#;\t\r\n"
+
 PINE_DOCS_PREFIX = "/pine-script-docs"
 PINE_REFERENCE_PREFIX = "/pine-script-reference"
 PINE_REFERENCE_V6_PREFIX = "/pine-script-reference/v6"
+JSON_ENCODER = json.JSONEncoder(sort_keys=True)
+INDENTED_JSON_ENCODER = json.JSONEncoder(indent=2, sort_keys=True)
+ISO_UTC_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
+UTF8_HTML_PARSER = lxml.html.HTMLParser(encoding="utf-8")
 
 
 @dataclass(frozen=True)
@@ -47,34 +63,8 @@ class ExcludedUrl:
     reason: str
 
 
-class LinkExtractor(HTMLParser):
-    def __init__(self) -> None:
-        super().__init__()
-        self.hrefs: list[str] = []
-
-    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
-        if tag != "a":
-            return
-        for key, value in attrs:
-            if key == "href" and value:
-                self.hrefs.append(value)
-
-
-class ScriptSrcExtractor(HTMLParser):
-    def __init__(self) -> None:
-        super().__init__()
-        self.srcs: list[str] = []
-
-    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
-        if tag != "script":
-            return
-        for key, value in attrs:
-            if key == "src" and value:
-                self.srcs.append(value)
-
-
 def utc_now_iso() -> str:
-    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+    return datetime.now(timezone.utc).strftime(ISO_UTC_FORMAT)
 
 
 def normalize_entry_point(url: str) -> str:
@@ -84,7 +74,20 @@ def normalize_entry_point(url: str) -> str:
     return canonical
 
 
+@functools.lru_cache(maxsize=100_000)
+def _parsed_path(url: str) -> str:
+    return urlparse(url).path
+
+
+@functools.lru_cache(maxsize=100_000)
 def canonicalize_url(raw_url: str) -> str | None:
+    if raw_url.startswith(CANONICAL_ORIGIN + "/") and not any(
+        char in raw_url for char in URL_SPLIT_CHARS
+    ):
+        path = raw_url[len(CANONICAL_ORIGIN) :]
+        if path != "/" and path.endswith("/"):
+            path = path.rstrip("/")
+        return CANONICAL_ORIGIN + path
     parsed = urlparse(raw_url)
     if not parsed.scheme and not parsed.netloc:
         return None
@@ -110,11 +113,24 @@ def resolve_and_canonicalize(raw_href: str, base_url: str) -> str | None:
     return canonicalize_url(resolved)
 
 
+def extract_attribute_values(html: str, tag: str, attribute: str) -> list[str]:
+    try:
+        document = lxml.html.document_fromstring(
+            html.encode("utf-8"), parser=UTF8_HTML_PARSER
+        )
+    except ParserError:
+        return []
+    values: list[str] = []
+    for element in document.iter(tag):
+        value = element.get(attribute)
+        if value:
+            values.append(value)
+    return values
+
+
 def extract_links(html: str, base_url: str) -> list[str]:
-    parser = LinkExtractor()
-    parser.feed(html)
     links: list[str] = []
-    for href in parser.hrefs:
+    for href in extract_attribute_values(html, "a", "href"):
         canonical = resolve_and_canonicalize(href, base_url)
         if canonical:
             links.append(canonical)
@@ -132,13 +148,17 @@ def is_in_scope(canonical_url: str, entry_prefixes: list[str]) -> bool:
     return False
 
 
+def _is_excluded(path: str) -> bool:
+    return EXCLUDED_PATH_RE.search(path.lower()) is not None
+
+
 def is_excluded_path(canonical_url: str) -> bool:
-    path = urlparse(canonical_url).path.lower()
-    return any(segment in path for segment in EXCLUDED_PATH_SEGMENTS)
+    return _is_excluded(_parsed_path(canonical_url))
 
 
+@functools.lru_cache(maxsize=100_000)
 def detect_doc_type(canonical_url: str) -> str | None:
-    path = urlparse(canonical_url).path
+    path = _parsed_path(canonical_url)
     if path.startswith(PINE_DOCS_PREFIX):
         return "guide"
     if path.startswith(PINE_REFERENCE_PREFIX):
@@ -146,8 +166,7 @@ def detect_doc_type(canonical_url: str) -> str | None:
     return None
 
 
-def detect_pine_version(canonical_url: str) -> str | None:
-    path = urlparse(canonical_url).path
+def _pine_version(path: str) -> str | None:
     if "/v6/" in path or path.endswith("/v6"):
         return "v6"
     if "/v5/" in path or path.endswith("/v5"):
@@ -155,6 +174,11 @@ def detect_pine_version(canonical_url: str) -> str | None:
     return None
 
 
+@functools.lru_cache(maxsize=100_000)
+def detect_pine_version(canonical_url: str) -> str | None:
+    return _pine_version(_parsed_path(canonical_url))
+
+
 def fetch_bytes(url: str) -> bytes:
     from urllib.request import Request, urlopen
 
@@ -163,37 +187,36 @@ def fetch_bytes(url: str) -> bytes:
         return response.read()
 
 
-def decode_text(payload: bytes) -> str:
+def decompress_payload(payload: bytes) -> bytes:
     if payload[:2] == b"\x1f\x8b":
-        payload = gzip.decompress(payload)
-    return payload.decode("utf-8", errors="replace")
+        return gzip.decompress(payload)
+    return payload
 
 
-def parse_sitemap_urls(xml_text: str) -> list[str]:
-    root = ET.fromstring(xml_text)
+def parse_sitemap_urls(xml_bytes: bytes) -> list[str]:
     urls: list[str] = []
-    for elem in root.iter():
+    for _, elem in ET.iterparse(io.BytesIO(xml_bytes), events=("end",)):
         if elem.tag.endswith("loc") and elem.text:
             urls.append(elem.text.strip())
+        elem.clear()
     return urls
 
 
 def discover_guide_urls(
     sitemap_index_url: str, entry_point: str, discovered_at: str
 ) -> tuple[list[DiscoveredUrl], list[ExcludedUrl]]:
-    sitemap_index_text = decode_text(fetch_bytes(sitemap_index_url))
-    sitemap_urls = parse_sitemap_urls(sitemap_index_text)
+    sitemap_index = decompress_payload(fetch_bytes(sitemap_index_url))
+    sitemap_urls = parse_sitemap_urls(sitemap_index)
     discovered: dict[str, DiscoveredUrl] = {}
     excluded: list[ExcludedUrl] = []
 
     for sitemap_url in sitemap_urls:
-        sitemap_text = decode_text(fetch_bytes(sitemap_url))
-        loc_urls = parse_sitemap_urls(sitemap_text)
+        loc_urls = parse_sitemap_urls(decompress_payload(fetch_bytes(sitemap_url)))
         for raw_url in loc_urls:
             canonical = canonicalize_url(raw_url)
             if not canonical:
                 continue
-            path = urlparse(canonical).path
+            path = _parsed_path(canonical)
             if not path.startswith(PINE_DOCS_PREFIX):
                 excluded.append(
                     ExcludedUrl(
@@ -214,7 +237,7 @@ def discover_guide_urls(
                     )
                 )
                 continue
-            if is_excluded_path(canonical):
+            if _is_excluded(path):
                 excluded.append(
                     ExcludedUrl(
                         raw_url=raw_url,
@@ -224,7 +247,7 @@ def discover_guide_urls(
                     )
                 )
                 continue
-            pine_version = detect_pine_version(canonical)
+            pine_version = _pine_version(path)
             if pine_version is None:
                 excluded.append(
                     ExcludedUrl(
@@ -254,14 +277,12 @@ def discover_guide_urls(
                 discovery_method="sitemap",
             )
 
-    return sorted(discovered.values(), key=lambda item: item.canonical_url), excluded
+    return [item for _, item in sorted(discovered.items())], excluded
 
 
 def extract_script_sources(html: str, base_url: str) -> list[str]:
-    parser = ScriptSrcExtractor()
-    parser.feed(html)
     sources: list[str] = []
-    for src in parser.srcs:
+    for src in extract_attribute_values(html, "script", "src"):
         resolved = urljoin(base_url, src)
         canonical = canonicalize_url(resolved)
         if canonical:
@@ -302,7 +323,7 @@ def discover_reference_urls(
             )
         ]
 
-    if not urlparse(canonical).path.startswith(PINE_REFERENCE_V6_PREFIX):
+    if not _parsed_path(canonical).startswith(PINE_REFERENCE_V6_PREFIX):
         return [], [
             ExcludedUrl(
                 raw_url=entry_point,
@@ -358,20 +379,17 @@ def discover_urls(entry_points: Iterable[str]) -> tuple[list[DiscoveredUrl], lis
             )
         )
 
-    return sorted(discovered.values(), key=lambda item: item.canonical_url), sorted(
-        excluded, key=lambda item: item.resolved_url
-    )
+    excluded.sort(key=attrgetter("resolved_url"))
+    return [item for _, item in sorted(discovered.items())], excluded
 
 
 def write_inventory(path: str, items: list[DiscoveredUrl]) -> None:
     payload = [item.__dict__ for item in items]
     with open(path, "w", encoding="utf-8") as handle:
-        json.dump(payload, handle, indent=2, sort_keys=True)
-        handle.write("\n")
+        handle.write(INDENTED_JSON_ENCODER.encode(payload) + "\n")
 
 
 def write_excluded(path: str, items: list[ExcludedUrl]) -> None:
+    lines = [JSON_ENCODER.encode(item.__dict__) + "\n" for item in items]
     with open(path, "w", encoding="utf-8") as handle:
-        for item in items:
-            handle.write(json.dumps(item.__dict__, sort_keys=True))
-            handle.write("\n")
+        handle.write("".join(lines))
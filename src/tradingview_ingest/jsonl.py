@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import json
+from dataclasses import fields
+from typing import BinaryIO, Iterable
+
+
+JSON_ENCODER = json.JSONEncoder(sort_keys=True)
+WRITE_BATCH_BYTES = 1 << 20
+
+
+def record_keys(record_type: type) -> tuple[str, ...]:
+    return tuple(sorted(field.name for field in fields(record_type)))
+
+
+def record_fields(record: object, keys: tuple[str, ...]) -> dict:
+    return {key: getattr(record, key) for key in keys}
+
+
+def write_records(handle: BinaryIO, records: Iterable[dict]) -> int:
+    count = 0
+    batch: list[str] = []
+    batch_size = 0
+    for record in records:
+        line = JSON_ENCODER.encode(record) + "\n"
+        batch.append(line)
+        batch_size += len(line)
+        count += 1
+        if batch_size >= WRITE_BATCH_BYTES:
+            handle.write("".join(batch).encode("utf-8"))
+            batch.clear()
+            batch_size = 0
+    if batch:
+        handle.write("".join(batch).encode("utf-8"))
+    return count
@@ -1,18 +1,34 @@
 from __future__ import annotations
 
+import functools
 import gzip
 import hashlib
 import json
 import os
+import re
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from glob import glob
-from typing import Iterable
+from operator import attrgetter
+from typing import BinaryIO, Iterable, Iterator
 
+import bs4
+import lxml.etree
+import lxml.html
 from bs4 import BeautifulSoup
 
+from tradingview_ingest.jsonl import record_fields, record_keys, write_records
 
-@dataclass(frozen=True)
+
+ISO_UTC_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
+INDENTED_JSON_ENCODER = json.JSONEncoder(indent=2, sort_keys=True)
+HEADING_HINT_RE = re.compile(r"<h[123]", re.IGNORECASE)
+SECTION_LEVELS = (("h2", "h2"), ("h3", "h3"), ("h1", "lead"))
+UTF8_HTML_PARSER = lxml.html.HTMLParser(encoding="utf-8")
+
+
+@dataclass(frozen=True, slots=True)
 class GuideSegment:
     source_artifact_id: str
     canonical_url: str
@@ -23,7 +39,7 @@ class GuideSegment:
     raw_html: str
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class GuidePage:
     guide_page_id: str
     canonical_url: str
@@ -32,7 +48,7 @@ class GuidePage:
     page_order: int
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class GuideSection:
     guide_section_id: str
     guide_page_id: str
@@ -46,44 +62,55 @@ class GuideSection:
     raw_html: str
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class WarningRecord:
     canonical_url: str
     source_artifact_id: str
     reason: str
 
 
+PAGE_KEYS = record_keys(GuidePage)
+SECTION_KEYS = record_keys(GuideSection)
+WARNING_KEYS = record_keys(WarningRecord)
+
+
 def utc_now_iso() -> str:
-    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+    return datetime.now(timezone.utc).strftime(ISO_UTC_FORMAT)
 
 
+@functools.lru_cache(maxsize=1 << 16)
 def sha256_hex(value: str) -> str:
     return hashlib.sha256(value.encode("utf-8")).hexdigest()
 
 
-def load_segments(path: str) -> list[GuideSegment]:
-    segments: list[GuideSegment] = []
-    with open(path, "r", encoding="utf-8") as handle:
+def load_segments(path: str) -> Iterator[GuideSegment]:
+    with open(path, "rb") as handle:
         for line in handle:
-            if not line.strip():
+            if line.isspace():
                 continue
             item = json.loads(line)
             if item.get("doc_type") != "guide":
                 continue
             if item.get("pine_version") != "v5":
                 raise ValueError("non_v5_segment_detected")
-            segments.append(
-                GuideSegment(
-                    source_artifact_id=item["source_artifact_id"],
-                    canonical_url=item["canonical_url"],
-                    doc_type=item["doc_type"],
-                    pine_version=item["pine_version"],
-                    segment_id=item["segment_id"],
-                    segment_order=int(item["segment_order"]),
-                    raw_html=item["raw_html"],
-                )
+            yield GuideSegment(
+                source_artifact_id=item["source_artifact_id"],
+                canonical_url=item["canonical_url"],
+                doc_type=item["doc_type"],
+                pine_version=item["pine_version"],
+                segment_id=item["segment_id"],
+                segment_order=int(item["segment_order"]),
+                raw_html=item["raw_html"],
             )
-    return segments
+
+
+def group_segments_by_url(
+    segments: Iterable[GuideSegment],
+) -> dict[str, list[GuideSegment]]:
+    segments_by_url: dict[str, list[GuideSegment]] = {}
+    for segment in segments:
+        segments_by_url.setdefault(segment.canonical_url, []).append(segment)
+    return segments_by_url
 
 
 def latest_segment_file(root: str) -> str:
@@ -107,9 +134,9 @@ def load_fallback_pages(root: str) -> list[tuple[str, str]]:
     if not run_path:
         return []
     fallback: list[tuple[str, str]] = []
-    with open(run_path, "r", encoding="utf-8") as handle:
+    with open(run_path, "rb") as handle:
         for line in handle:
-            if not line.strip():
+            if line.isspace():
                 continue
             item = json.loads(line)
             if item.get("doc_type") != "guide":
@@ -123,15 +150,20 @@ def load_fallback_pages(root: str) -> list[tuple[str, str]]:
 
 
 def decode_raw_html(raw_path: str) -> str:
-    raw = open(raw_path, "rb").read()
-    if raw[:2] == b"\x1f\x8b":
-        raw = gzip.decompress(raw)
+    with open(raw_path, "rb") as handle:
+        if handle.peek(2)[:2] == b"\x1f\x8b":
+            with gzip.GzipFile(fileobj=handle) as archive:
+                raw = archive.read()
+        else:
+            raw = handle.read()
     return raw.decode("utf-8", errors="replace")
 
 
 def extract_main_html(full_html: str) -> str:
-    soup = BeautifulSoup(full_html, "html.parser")
-    container = soup.select_one("main.content") or soup.select_one("main.main-pane")
+    soup = BeautifulSoup(full_html, "lxml")
+    container = soup.find("main", class_="content") or soup.find(
+        "main", class_="main-pane"
+    )
     if container is None:
         container = soup.body
     if container is None:
@@ -139,24 +171,29 @@ def extract_main_html(full_html: str) -> str:
     return "".join(str(node) for node in container.contents).strip()
 
 
+def decode_and_extract(raw_path: str) -> str:
+    return extract_main_html(decode_raw_html(raw_path))
+
+
 def infer_section_level(raw_html: str) -> str:
-    soup = BeautifulSoup(raw_html, "html.parser")
-    for tag_name in ("h2", "h3", "h1"):
-        heading = soup.find(tag_name)
-        if heading:
-            if tag_name == "h1":
-                return "lead"
-            return tag_name
+    if not HEADING_HINT_RE.search(raw_html):
+        return "fallback"
+    try:
+        document = lxml.html.document_fromstring(
+            raw_html.encode("utf-8"), parser=UTF8_HTML_PARSER
+        )
+    except lxml.etree.ParserError:
+        return "fallback"
+    for tag, level in SECTION_LEVELS:
+        if next(document.iter(tag), None) is not None:
+            return level
     return "fallback"
 
 
-def build_pages(segments: Iterable[GuideSegment]) -> list[GuidePage]:
-    by_url: dict[str, GuideSegment] = {}
-    for segment in segments:
-        if segment.canonical_url not in by_url:
-            by_url[segment.canonical_url] = segment
+def build_pages(segments_by_url: dict[str, list[GuideSegment]]) -> list[GuidePage]:
     pages: list[GuidePage] = []
-    for canonical_url, segment in sorted(by_url.items()):
+    for canonical_url, page_segments in sorted(segments_by_url.items()):
+        segment = page_segments[0]
         pages.append(
             GuidePage(
                 guide_page_id=sha256_hex(canonical_url),
@@ -170,20 +207,20 @@ def build_pages(segments: Iterable[GuideSegment]) -> list[GuidePage]:
 
 
 def build_sections(
-    segments: Iterable[GuideSegment], fallback_pages: list[tuple[str, str]], raw_root: str
+    segments_by_url: dict[str, list[GuideSegment]],
+    fallback_pages: list[tuple[str, str]],
+    raw_root: str,
+    workers: int = 1,
 ) -> tuple[list[GuideSection], list[WarningRecord]]:
     warnings: list[WarningRecord] = []
     sections: list[GuideSection] = []
 
-    segments_by_url: dict[str, list[GuideSegment]] = {}
-    for segment in segments:
-        segments_by_url.setdefault(segment.canonical_url, []).append(segment)
+    page_id_by_url = {url: sha256_hex(url) for url in segments_by_url}
 
     for canonical_url, page_segments in segments_by_url.items():
-        page_segments.sort(key=lambda item: item.segment_order)
-        guide_page_id = sha256_hex(canonical_url)
+        guide_page_id = page_id_by_url[canonical_url]
         last_h2_id: str | None = None
-        for segment in page_segments:
+        for segment in sorted(page_segments, key=attrgetter("segment_order")):
             if not segment.raw_html.strip():
                 warnings.append(
                     WarningRecord(
@@ -193,6 +230,7 @@ def build_sections(
                     )
                 )
             section_level = infer_section_level(segment.raw_html)
+            guide_section_id = sha256_hex(segment.segment_id)
             parent_section_id = None
             if section_level == "h3":
                 parent_section_id = last_h2_id
@@ -205,11 +243,11 @@ def build_sections(
                         )
                     )
             if section_level == "h2":
-                last_h2_id = sha256_hex(segment.segment_id)
+                last_h2_id = guide_section_id
 
             sections.append(
                 GuideSection(
-                    guide_section_id=sha256_hex(segment.segment_id),
+                    guide_section_id=guide_section_id,
                     guide_page_id=guide_page_id,
                     pine_version="v5",
                     parent_section_id=parent_section_id,
@@ -222,14 +260,27 @@ def build_sections(
                 )
             )
 
+    pending: list[tuple[str, str, str]] = []
     for canonical_url, source_artifact_id in fallback_pages:
         if canonical_url in segments_by_url:
             continue
         raw_path = os.path.join(raw_root, "guide", "v5", f"{source_artifact_id}.html")
         if not os.path.exists(raw_path):
             raise ValueError("fallback_raw_missing")
-        full_html = decode_raw_html(raw_path)
-        raw_html = extract_main_html(full_html)
+        pending.append((canonical_url, source_artifact_id, raw_path))
+
+    raw_paths = [raw_path for _, _, raw_path in pending]
+    if workers > 1 and len(raw_paths) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            fallback_html = list(
+                executor.map(decode_and_extract, raw_paths, chunksize=4)
+            )
+    else:
+        fallback_html = [decode_and_extract(raw_path) for raw_path in raw_paths]
+
+    for (canonical_url, source_artifact_id, _), raw_html in zip(
+        pending, fallback_html
+    ):
         segment_id = f"{source_artifact_id}:fallback"
         guide_page_id = sha256_hex(canonical_url)
         warnings.append(
@@ -257,65 +308,140 @@ def build_sections(
     return sections, warnings
 
 
-def load_existing_ids(path: str, field: str) -> set[str]:
-    if not os.path.exists(path):
-        return set()
+def open_dedup_append(path: str, field: str) -> tuple[set[str], BinaryIO]:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    handle = open(path, "a+b")
+    handle.seek(0)
     existing: set[str] = set()
-    with open(path, "r", encoding="utf-8") as handle:
-        for line in handle:
-            if not line.strip():
-                continue
-            item = json.loads(line)
-            value = item.get(field)
-            if value:
-                existing.add(value)
-    return existing
+    for line in handle:
+        if line.isspace():
+            continue
+        value = json.loads(line).get(field)
+        if value:
+            existing.add(value)
+    return existing, handle
 
 
 def append_jsonl(path: str, records: Iterable[dict]) -> int:
     os.makedirs(os.path.dirname(path), exist_ok=True)
-    count = 0
-    with open(path, "a", encoding="utf-8") as handle:
-        for record in records:
-            handle.write(json.dumps(record, sort_keys=True))
-            handle.write("\n")
-            count += 1
-    return count
+    with open(path, "ab") as handle:
+        return write_records(handle, records)
 
 
-def normalize_guides(root: str) -> tuple[int, int, int, list[WarningRecord]]:
-    segments_path = latest_segment_file(root)
-    segments = load_segments(segments_path)
-    fallback_pages = load_fallback_pages(root)
+def file_signature(path: str | None) -> list | None:
+    if path is None:
+        return None
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [path, stat.st_size, stat.st_mtime_ns]
 
-    pages = build_pages(segments)
-    sections, warnings = build_sections(
-        segments=segments, fallback_pages=fallback_pages, raw_root=os.path.join(root, "raw")
+
+@functools.lru_cache(maxsize=1)
+def normalizer_fingerprint() -> str:
+    with open(__file__, "rb") as handle:
+        digest = hashlib.sha256(handle.read())
+    digest.update(f"bs4={bs4.__version__};lxml={lxml.etree.__version__}".encode())
+    return digest.hexdigest()
+
+
+def load_manifest(path: str) -> dict | None:
+    try:
+        with open(path, "rb") as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return None
+
+
+def write_manifest(path: str, record: dict) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as handle:
+        handle.write(INDENTED_JSON_ENCODER.encode(record) + "\n")
+
+
+def count_fallback_sections(warnings: Iterable[WarningRecord]) -> int:
+    return sum(
+        1 for warning in warnings if warning.reason == "fallback_section_created"
     )
 
+
+def normalize_guides(
+    root: str, workers: int = 1
+) -> tuple[int, int, int, list[WarningRecord]]:
+    if workers < 1:
+        raise ValueError(f"invalid_workers:{workers}")
+    segments_path = latest_segment_file(root)
     pages_out = os.path.join(root, "normalized", "v5", "guide_pages.jsonl")
     sections_out = os.path.join(root, "normalized", "v5", "guide_sections.jsonl")
-    warnings_out = os.path.join(root, "artifacts", "normalization_runs", f"{utc_now_iso()}.jsonl")
-
-    existing_pages = load_existing_ids(pages_out, "guide_page_id")
-    existing_sections = load_existing_ids(sections_out, "guide_section_id")
+    runs_dir = os.path.join(root, "artifacts", "normalization_runs")
+    warnings_out = os.path.join(runs_dir, f"{utc_now_iso()}.jsonl")
+    manifest_path = os.path.join(root, "artifacts", "cache", "normalize_guides.json")
+
+    inputs = {
+        "normalizer": normalizer_fingerprint(),
+        "segments": file_signature(segments_path),
+        "segmentation_run": file_signature(latest_segmentation_run(root)),
+    }
+    manifest = load_manifest(manifest_path)
+    if (
+        manifest is not None
+        and manifest.get("inputs") == inputs
+        and manifest.get("outputs")
+        == {
+            "guide_pages": file_signature(pages_out),
+            "guide_sections": file_signature(sections_out),
+        }
+    ):
+        warnings = [WarningRecord(**item) for item in manifest["warnings"]]
+        append_jsonl(warnings_out, manifest["warnings"])
+        return 0, 0, count_fallback_sections(warnings), warnings
+
+    segments_by_url = group_segments_by_url(load_segments(segments_path))
+    fallback_pages = load_fallback_pages(root)
 
-    pages_written = append_jsonl(
-        pages_out,
-        [page.__dict__ for page in pages if page.guide_page_id not in existing_pages],
-    )
-    sections_written = append_jsonl(
-        sections_out,
-        [
-            section.__dict__
-            for section in sections
-            if section.guide_section_id not in existing_sections
-        ],
+    pages = build_pages(segments_by_url)
+    sections, warnings = build_sections(
+        segments_by_url=segments_by_url,
+        fallback_pages=fallback_pages,
+        raw_root=os.path.join(root, "raw"),
+        workers=workers,
     )
-    append_jsonl(warnings_out, [warning.__dict__ for warning in warnings])
 
-    fallback_count = sum(
-        1 for warning in warnings if warning.reason == "fallback_section_created"
+    existing_pages, pages_handle = open_dedup_append(pages_out, "guide_page_id")
+    with pages_handle:
+        pages_written = write_records(
+            pages_handle,
+            (
+                record_fields(page, PAGE_KEYS)
+                for page in pages
+                if page.guide_page_id not in existing_pages
+            ),
+        )
+    existing_sections, sections_handle = open_dedup_append(
+        sections_out, "guide_section_id"
+    )
+    with sections_handle:
+        sections_written = write_records(
+            sections_handle,
+            (
+                record_fields(section, SECTION_KEYS)
+                for section in sections
+                if section.guide_section_id not in existing_sections
+            ),
+        )
+    warning_records = [record_fields(warning, WARNING_KEYS) for warning in warnings]
+    append_jsonl(warnings_out, warning_records)
+    write_manifest(
+        manifest_path,
+        {
+            "inputs": inputs,
+            "outputs": {
+                "guide_pages": file_signature(pages_out),
+                "guide_sections": file_signature(sections_out),
+            },
+            "warnings": warning_records,
+        },
     )
 
-    return pages_written, sections_written, fallback_count, warnings
+    return pages_written, sections_written, count_fallback_sections(warnings), warnings
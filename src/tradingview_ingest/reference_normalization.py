@@ -14,12 +14,22 @@ ANCHOR_PREFIXES = [
     "an_",
 ]
 SYMBOL_TYPES = {prefix.rstrip("_") for prefix in ANCHOR_PREFIXES}
+JSON_ENCODER = json.JSONEncoder(sort_keys=True)
+REQUIRED_SOURCE_FIELDS = (
+    "symbol_name",
+    "canonical_url",
+    "segment_order",
+    "raw_html",
+    "run_id",
+    "source_artifact_id",
+    "segment_id",
+)
 
 
 def derive_symbol_type(anchor_id: str) -> str:
-    for prefix in ANCHOR_PREFIXES:
-        if anchor_id.startswith(prefix):
-            return prefix.rstrip("_")
+    head, separator, _ = anchor_id.partition("_")
+    if separator and head in SYMBOL_TYPES:
+        return head
     raise ValueError(f"unknown_anchor_prefix:{anchor_id}")
 
 
@@ -35,7 +45,7 @@ def normalize_reference_symbols(
     sample_ids: list[str] = []
     written = 0
 
-    with open(segments_path, "r", encoding="utf-8") as source, open(
+    with open(segments_path, "rb") as source, open(
         output_path, "a", encoding="utf-8"
     ) as target:
         for line in source:
@@ -48,10 +58,20 @@ def normalize_reference_symbols(
             reference_symbol_id = f"{source_artifact_id}:{anchor_id}"
             symbol_type = derive_symbol_type(anchor_id)
 
+            missing = [
+                field
+                for field in REQUIRED_SOURCE_FIELDS
+                if segment.get(field) in (None, "")
+            ]
+            if missing:
+                raise ValueError(f"missing_required:{','.join(missing)}")
+            if reference_symbol_id in seen_ids:
+                raise ValueError(f"duplicate_reference_symbol_id:{reference_symbol_id}")
+
             record = {
                 "reference_symbol_id": reference_symbol_id,
                 "anchor_id": anchor_id,
-                "symbol_name": segment.get("symbol_name", ""),
+                "symbol_name": segment["symbol_name"],
                 "symbol_type": symbol_type,
                 "canonical_url": segment.get("canonical_url"),
                 "pine_version": "v6",
@@ -66,35 +86,11 @@ def normalize_reference_symbols(
                 "notes": "",
             }
 
-            required = [
-                "reference_symbol_id",
-                "anchor_id",
-                "symbol_name",
-                "symbol_type",
-                "canonical_url",
-                "pine_version",
-                "segment_order",
-                "raw_html",
-                "run_id",
-                "source_artifact_id",
-                "segment_id",
-            ]
-            missing = [key for key in required if record.get(key) in (None, "")]
-            if missing:
-                raise ValueError(f"missing_required:{','.join(missing)}")
-            if record["pine_version"] != "v6":
-                raise ValueError(f"invalid_pine_version:{record['pine_version']}")
-            if record["symbol_type"] not in SYMBOL_TYPES:
-                raise ValueError(f"invalid_symbol_type:{record['symbol_type']}")
-            if reference_symbol_id in seen_ids:
-                raise ValueError(f"duplicate_reference_symbol_id:{reference_symbol_id}")
-
             seen_ids.add(reference_symbol_id)
             if len(sample_ids) < 5:
                 sample_ids.append(reference_symbol_id)
 
-            target.write(json.dumps(record, sort_keys=True))
-            target.write("\n")
+            target.write(JSON_ENCODER.encode(record) + "\n")
             written += 1
 
     return written, sample_ids
@@ -3,12 +3,13 @@ from __future__ import annotations
 import hashlib
 import json
 import os
+import re
 import time
 from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import Iterable
+from typing import Iterable, Iterator
 
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, Tag
 from playwright.sync_api import sync_playwright
 
 
@@ -22,9 +23,17 @@ ANCHOR_PREFIXES = [
     "op_",
     "an_",
 ]
+ANCHOR_PREFIX_TUPLE = tuple(ANCHOR_PREFIXES)
+ANCHOR_TYPES = frozenset(prefix.rstrip("_") for prefix in ANCHOR_PREFIXES)
+ANCHOR_ID_PATTERN = "^(?:" + "|".join(sorted(ANCHOR_TYPES)) + ")_"
+ANCHOR_ID_RE = re.compile(ANCHOR_ID_PATTERN)
+HTML_WRITE_CHUNK_CHARS = 1 << 20
+ISO_UTC_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
+JSON_ENCODER = json.JSONEncoder(sort_keys=True)
+INDENTED_JSON_ENCODER = json.JSONEncoder(indent=2, sort_keys=True)
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class RenderConfig:
     viewport: dict[str, int]
     locale: str
@@ -39,7 +48,7 @@ class RenderConfig:
     max_scrolls: int
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class RenderResult:
     html: str
     anchor_ids: list[str]
@@ -51,7 +60,7 @@ class RenderResult:
 
 
 def utc_now_iso() -> str:
-    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+    return datetime.now(timezone.utc).strftime(ISO_UTC_FORMAT)
 
 
 def sha256_hex(payload: bytes) -> str:
@@ -63,13 +72,19 @@ def ensure_directories(paths: Iterable[str]) -> None:
         os.makedirs(path, exist_ok=True)
 
 
+def anchor_type(anchor_id: str) -> str | None:
+    head, separator, _ = anchor_id.partition("_")
+    if separator and head in ANCHOR_TYPES:
+        return head
+    return None
+
+
 def anchor_prefix_counts(anchor_ids: list[str]) -> dict[str, int]:
     counts = {prefix: 0 for prefix in ANCHOR_PREFIXES}
     for anchor_id in anchor_ids:
-        for prefix in ANCHOR_PREFIXES:
-            if anchor_id.startswith(prefix):
-                counts[prefix] += 1
-                break
+        symbol_type = anchor_type(anchor_id)
+        if symbol_type:
+            counts[symbol_type + "_"] += 1
     return counts
 
 
@@ -97,24 +112,17 @@ def render_reference(
         while True:
             anchor_ids = page.evaluate(
                 """
-                (prefixes) => {
-                    const nodes = Array.from(document.querySelectorAll('[id]'));
+                (pattern) => {
+                    const anchorId = new RegExp(pattern);
                     const ids = [];
-                    for (const node of nodes) {
+                    for (const node of document.querySelectorAll('[id]')) {
                         const id = node.getAttribute('id');
-                        if (!id) continue;
-                        if (id === 'tv-content') continue;
-                        for (const prefix of prefixes) {
-                            if (id.startsWith(prefix)) {
-                                ids.push(id);
-                                break;
-                            }
-                        }
+                        if (id && anchorId.test(id)) ids.push(id);
                     }
                     return ids;
                 }
                 """,
-                ANCHOR_PREFIXES,
+                ANCHOR_ID_PATTERN,
             )
             current_count = len(anchor_ids)
             if current_count == previous_count:
@@ -162,34 +170,47 @@ def render_reference(
     )
 
 
+def write_html(path: str, html: str) -> tuple[int, str]:
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "wb") as handle:
+        for start in range(0, len(html), HTML_WRITE_CHUNK_CHARS):
+            chunk = html[start : start + HTML_WRITE_CHUNK_CHARS].encode("utf-8")
+            handle.write(chunk)
+            digest.update(chunk)
+            size += len(chunk)
+    return size, digest.hexdigest()
+
+
 def write_manifest(path: str, record: dict) -> None:
     with open(path, "w", encoding="utf-8") as handle:
-        json.dump(record, handle, indent=2, sort_keys=True)
-        handle.write("\n")
+        handle.write(INDENTED_JSON_ENCODER.encode(record) + "\n")
 
 
 def write_jsonl(path: str, record: dict) -> None:
     os.makedirs(os.path.dirname(path), exist_ok=True)
     with open(path, "a", encoding="utf-8") as handle:
-        handle.write(json.dumps(record, sort_keys=True))
-        handle.write("\n")
+        handle.write(JSON_ENCODER.encode(record) + "\n")
 
 
 def find_anchor_elements(soup: BeautifulSoup) -> list[object]:
-    anchors = []
-    for tag in soup.find_all(attrs={"id": True}):
-        anchor_id = tag.get("id")
-        if anchor_id == "tv-content":
-            continue
-        for prefix in ANCHOR_PREFIXES:
-            if anchor_id.startswith(prefix):
-                anchors.append(tag)
-                break
-    return anchors
+    return list(soup.find_all(id=ANCHOR_ID_RE))
 
 
 def serialize_nodes(nodes: Iterable[object]) -> str:
-    return "".join(str(node) for node in nodes).strip()
+    return "".join(
+        node.decode() if isinstance(node, Tag) else str(node) for node in nodes
+    ).strip()
+
+
+def segment_nodes(anchor: Tag) -> Iterator[object]:
+    yield anchor
+    for sibling in anchor.next_siblings:
+        if isinstance(sibling, Tag):
+            sibling_id = sibling.get("id")
+            if sibling_id and sibling_id.startswith(ANCHOR_PREFIX_TUPLE):
+                return
+        yield sibling
 
 
 def infer_symbol_name(anchor_tag) -> str:
@@ -211,10 +232,7 @@ def infer_symbol_type(anchor_tag, anchor_id: str) -> str:
         text = candidate.get_text(strip=True)
         if text:
             return text
-    for prefix in ANCHOR_PREFIXES:
-        if anchor_id.startswith(prefix):
-            return prefix.rstrip("_")
-    return "unknown"
+    return anchor_type(anchor_id) or "unknown"
 
 
 def segment_reference_html(
@@ -223,8 +241,10 @@ def segment_reference_html(
     run_id: str,
     source_artifact_id: str,
 ) -> tuple[list[dict], dict]:
-    soup = BeautifulSoup(html, "html.parser")
-    container = soup.select_one("main#tv-content") or soup.select_one("main.tv-content")
+    soup = BeautifulSoup(html, "lxml")
+    container = soup.find("main", id="tv-content") or soup.find(
+        "main", class_="tv-content"
+    )
     if container is None:
         raise ValueError("reference_container_missing")
 
@@ -242,14 +262,7 @@ def segment_reference_html(
             raise ValueError("duplicate_anchor_id")
         seen.add(anchor_id)
 
-        nodes = [anchor]
-        for sibling in list(anchor.next_siblings):
-            sibling_id = getattr(sibling, "attrs", {}).get("id")
-            if sibling_id and any(sibling_id.startswith(prefix) for prefix in ANCHOR_PREFIXES):
-                break
-            nodes.append(sibling)
-
-        raw_html = serialize_nodes(nodes)
+        raw_html = serialize_nodes(segment_nodes(anchor))
         if not raw_html:
             empty_raw += 1
 
@@ -283,7 +296,8 @@ def segment_reference_html(
 
 
 def read_manifest(path: str) -> dict:
-    return json.loads(open(path, "r", encoding="utf-8").read())
+    with open(path, "rb") as handle:
+        return json.load(handle)
 
 
 def drift_severity(anchor_count_delta: int, env_delta: bool) -> str:
@@ -3,23 +3,35 @@ from __future__ import annotations
 import gzip
 import json
 import os
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import Iterable
+from typing import Iterable, Iterator
 
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, Tag
+from bs4.builder import builder_registry
 
+from tradingview_ingest.jsonl import record_fields, record_keys, write_records
 
-@dataclass(frozen=True)
+
+ISO_UTC_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
+LXML_TREE_BUILDER = builder_registry.lookup("lxml")
+if LXML_TREE_BUILDER is None:
+    raise ImportError("lxml_tree_builder_missing")
+SYMBOL_TYPE_SELECTOR = '[class*="type" i], [class*="kind" i], [class*="category" i]'
+
+
+@dataclass(frozen=True, slots=True)
 class Artifact:
     source_artifact_id: str
     raw_path: str
     canonical_url: str
     doc_type: str
     pine_version: str
+    content_encoding: str | None = None
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Segment:
     source_artifact_id: str
     canonical_url: str
@@ -34,7 +46,7 @@ class Segment:
     symbol_type: str | None = None
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Failure:
     source_artifact_id: str
     canonical_url: str
@@ -43,74 +55,90 @@ class Failure:
     reason: str
 
 
+SEGMENT_KEYS = record_keys(Segment)
+FAILURE_KEYS = record_keys(Failure)
+
+
 def utc_now_iso() -> str:
-    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+    return datetime.now(timezone.utc).strftime(ISO_UTC_FORMAT)
 
 
-def decode_html(raw_bytes: bytes, content_encoding: str | None) -> str:
-    payload = raw_bytes
-    if content_encoding and "gzip" in content_encoding.lower():
-        payload = gzip.decompress(payload)
-    elif payload[:2] == b"\x1f\x8b":
-        payload = gzip.decompress(payload)
+def decode_html(raw_path: str, content_encoding: str | None) -> str:
+    with open(raw_path, "rb") as handle:
+        gzipped = bool(content_encoding and "gzip" in content_encoding.lower())
+        if gzipped or handle.peek(2)[:2] == b"\x1f\x8b":
+            with gzip.GzipFile(fileobj=handle) as archive:
+                payload = archive.read()
+        else:
+            payload = handle.read()
     return payload.decode("utf-8", errors="replace")
 
 
+def iter_meta_paths(raw_root: str) -> Iterator[str]:
+    stack = [raw_root]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                subdirs: list[str] = []
+                for entry in entries:
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    if is_dir:
+                        if not entry.is_symlink():
+                            subdirs.append(entry.path)
+                    elif entry.name.endswith(".html.meta.json"):
+                        yield entry.path
+        except OSError:
+            continue
+        stack.extend(reversed(subdirs))
+
+
 def load_artifacts(raw_root: str) -> list[Artifact]:
     artifacts: list[Artifact] = []
-    for root, _, files in os.walk(raw_root):
-        for filename in files:
-            if not filename.endswith(".html.meta.json"):
-                continue
-            meta_path = os.path.join(root, filename)
-            meta = json.loads(open(meta_path, "r", encoding="utf-8").read())
-            raw_path = meta_path.replace(".meta.json", "")
-            artifact_id = os.path.basename(raw_path).replace(".html", "")
-            artifacts.append(
-                Artifact(
-                    source_artifact_id=artifact_id,
-                    raw_path=raw_path,
-                    canonical_url=meta["canonical_url"],
-                    doc_type=meta["doc_type"],
-                    pine_version=meta["pine_version"],
-                )
+    for meta_path in iter_meta_paths(raw_root):
+        with open(meta_path, "r", encoding="utf-8") as handle:
+            meta = json.load(handle)
+        raw_path = meta_path.replace(".meta.json", "")
+        artifact_id = os.path.basename(raw_path).replace(".html", "")
+        artifacts.append(
+            Artifact(
+                source_artifact_id=artifact_id,
+                raw_path=raw_path,
+                canonical_url=meta["canonical_url"],
+                doc_type=meta["doc_type"],
+                pine_version=meta["pine_version"],
+                content_encoding=meta.get("content_encoding"),
             )
+        )
     return sorted(artifacts, key=lambda item: item.canonical_url)
 
 
-def read_meta_content_encoding(raw_path: str) -> str | None:
-    meta_path = raw_path + ".meta.json"
-    if not os.path.exists(meta_path):
-        return None
-    meta = json.loads(open(meta_path, "r", encoding="utf-8").read())
-    return meta.get("content_encoding")
-
-
 def has_meaningful_text(nodes: Iterable[object]) -> bool:
     for node in nodes:
-        if hasattr(node, "get_text"):
-            if node.get_text(strip=True):
-                return True
-        else:
-            text = str(node).strip()
-            if text:
+        if hasattr(node, "stripped_strings"):
+            if next(node.stripped_strings, None) is not None:
                 return True
+        elif str(node).strip():
+            return True
     return False
 
 
 def serialize_nodes(nodes: Iterable[object]) -> str:
-    return "".join(str(node) for node in nodes).strip()
+    return "".join(
+        node.decode() if isinstance(node, Tag) else str(node) for node in nodes
+    ).strip()
 
 
 def parse_guide_segments(artifact: Artifact) -> list[Segment]:
-    raw_bytes = open(artifact.raw_path, "rb").read()
-    content_encoding = read_meta_content_encoding(artifact.raw_path)
-    html = decode_html(raw_bytes, content_encoding)
-    soup = BeautifulSoup(html, "html.parser")
+    html = decode_html(artifact.raw_path, artifact.content_encoding)
+    soup = BeautifulSoup(html, builder=LXML_TREE_BUILDER)
 
-    container = soup.select_one("main.content")
+    container = soup.find("main", class_="content")
     if container is None:
-        container = soup.select_one("main.main-pane")
+        container = soup.find("main", class_="main-pane")
     if container is None:
         container = soup.body
     if container is None:
@@ -126,7 +154,7 @@ def parse_guide_segments(artifact: Artifact) -> list[Segment]:
     first_h2 = headings[0]
     parent = first_h2.parent
     pre_nodes = []
-    for child in list(parent.children):
+    for child in parent.children:
         if child == first_h2:
             break
         pre_nodes.append(child)
@@ -148,7 +176,7 @@ def parse_guide_segments(artifact: Artifact) -> list[Segment]:
 
     for heading in headings:
         nodes = [heading]
-        for sibling in list(heading.next_siblings):
+        for sibling in heading.next_siblings:
             if getattr(sibling, "name", None) == "h2":
                 break
             nodes.append(sibling)
@@ -173,14 +201,7 @@ def parse_guide_segments(artifact: Artifact) -> list[Segment]:
 def extract_symbol_type(anchor_tag) -> str | None:
     if anchor_tag is None:
         return None
-    candidates = anchor_tag.find_all(
-        lambda tag: tag.has_attr("class")
-        and any(
-            key in " ".join(tag["class"]).lower()
-            for key in ("type", "kind", "category")
-        )
-    )
-    for candidate in candidates:
+    for candidate in anchor_tag.select(SYMBOL_TYPE_SELECTOR):
         text = candidate.get_text(strip=True)
         if text:
             return text
@@ -188,12 +209,12 @@ def extract_symbol_type(anchor_tag) -> str | None:
 
 
 def parse_reference_segments(artifact: Artifact) -> list[Segment]:
-    raw_bytes = open(artifact.raw_path, "rb").read()
-    content_encoding = read_meta_content_encoding(artifact.raw_path)
-    html = decode_html(raw_bytes, content_encoding)
-    soup = BeautifulSoup(html, "html.parser")
+    html = decode_html(artifact.raw_path, artifact.content_encoding)
+    soup = BeautifulSoup(html, builder=LXML_TREE_BUILDER)
 
-    container = soup.select_one("main#tv-content") or soup.select_one("main.tv-content")
+    container = soup.find("main", id="tv-content") or soup.find(
+        "main", class_="tv-content"
+    )
     if container is None:
         raise ValueError("reference_container_missing")
 
@@ -212,7 +233,7 @@ def parse_reference_segments(artifact: Artifact) -> list[Segment]:
     for anchor in anchors:
         anchor_id = anchor.get("id")
         nodes = [anchor]
-        for sibling in list(anchor.next_siblings):
+        for sibling in anchor.next_siblings:
             if getattr(sibling, "attrs", {}).get("id"):
                 break
             nodes.append(sibling)
@@ -239,53 +260,77 @@ def parse_reference_segments(artifact: Artifact) -> list[Segment]:
     return segments
 
 
-def segment_artifacts(raw_root: str) -> tuple[list[Segment], list[Failure]]:
+def segment_artifact(artifact: Artifact) -> tuple[list[Segment], Failure | None]:
+    try:
+        if artifact.doc_type == "guide":
+            return parse_guide_segments(artifact), None
+        if artifact.doc_type == "reference":
+            return parse_reference_segments(artifact), None
+        reason = "unknown_doc_type"
+    except ValueError as exc:
+        reason = str(exc)
+    return [], Failure(
+        source_artifact_id=artifact.source_artifact_id,
+        canonical_url=artifact.canonical_url,
+        doc_type=artifact.doc_type,
+        pine_version=artifact.pine_version,
+        reason=reason,
+    )
+
+
+def iter_segments(
+    raw_root: str, failures: list[Failure], workers: int = 1, strict: bool = False
+) -> Iterator[Segment]:
+    if workers < 1:
+        raise ValueError(f"invalid_workers:{workers}")
     artifacts = load_artifacts(raw_root)
-    segments: list[Segment] = []
-    failures: list[Failure] = []
 
-    for artifact in artifacts:
-        try:
-            if artifact.doc_type == "guide":
-                segments.extend(parse_guide_segments(artifact))
-            elif artifact.doc_type == "reference":
-                segments.extend(parse_reference_segments(artifact))
-            else:
-                failures.append(
-                    Failure(
-                        source_artifact_id=artifact.source_artifact_id,
-                        canonical_url=artifact.canonical_url,
-                        doc_type=artifact.doc_type,
-                        pine_version=artifact.pine_version,
-                        reason="unknown_doc_type",
-                    )
-                )
-        except ValueError as exc:
-            failures.append(
-                Failure(
-                    source_artifact_id=artifact.source_artifact_id,
-                    canonical_url=artifact.canonical_url,
-                    doc_type=artifact.doc_type,
-                    pine_version=artifact.pine_version,
-                    reason=str(exc),
-                )
-            )
-            if artifact.doc_type == "reference":
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    if executor is None:
+        results = map(segment_artifact, artifacts)
+    else:
+        results = executor.map(segment_artifact, artifacts, chunksize=4)
+    try:
+        for artifact_segments, failure in results:
+            yield from artifact_segments
+            if failure is None:
+                continue
+            failures.append(failure)
+            if strict and failure.doc_type == "reference":
                 break
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+def segment_artifacts(
+    raw_root: str, workers: int = 1, strict: bool = False
+) -> tuple[list[Segment], list[Failure]]:
+    failures: list[Failure] = []
+    segments = list(
+        iter_segments(raw_root, failures, workers=workers, strict=strict)
+    )
     return segments, failures
 
 
-def write_segments(path: str, segments: list[Segment]) -> None:
+def write_segments(path: str, segments: Iterable[Segment]) -> None:
     os.makedirs(os.path.dirname(path), exist_ok=True)
-    with open(path, "w", encoding="utf-8") as handle:
-        for segment in segments:
-            handle.write(json.dumps(segment.__dict__, sort_keys=True))
-            handle.write("\n")
+    part_path = f"{path}.part"
+    handle = open(part_path, "wb")
+    try:
+        with handle:
+            write_records(
+                handle, (record_fields(segment, SEGMENT_KEYS) for segment in segments)
+            )
+    except BaseException:
+        os.remove(part_path)
+        raise
+    os.replace(part_path, path)
 
 
 def write_failures(path: str, failures: list[Failure]) -> None:
     os.makedirs(os.path.dirname(path), exist_ok=True)
-    with open(path, "w", encoding="utf-8") as handle:
-        for failure in failures:
-            handle.write(json.dumps(failure.__dict__, sort_keys=True))
-            handle.write("\n")
+    with open(path, "wb") as handle:
+        write_records(
+            handle, (record_fields(failure, FAILURE_KEYS) for failure in failures)
+        )
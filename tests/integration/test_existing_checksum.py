@@ -0,0 +1,54 @@
+import json
+import os
+
+from tradingview_ingest import acquisition
+
+
+def write_file(path, payload: bytes) -> str:
+    with open(path, "wb") as handle:
+        handle.write(payload)
+    return str(path)
+
+
+def write_meta(tmp_path, checksum: str, raw_size: int) -> tuple[str, str]:
+    raw = write_file(tmp_path / "a.html", b"body")
+    meta = str(tmp_path / "a.html.meta.json")
+    with open(meta, "w", encoding="utf-8") as handle:
+        json.dump({"checksum": checksum, "raw_size": raw_size}, handle)
+    os.utime(raw, ns=(1_000_000_000, 1_000_000_000))
+    os.utime(meta, ns=(2_000_000_000, 2_000_000_000))
+    return meta, raw
+
+
+def test_existing_checksum_reuses_stored_checksum(tmp_path, monkeypatch) -> None:
+    meta, raw = write_meta(tmp_path, "stale", 4)
+
+    def refuse_hash(path):
+        raise AssertionError("rehashed")
+
+    monkeypatch.setattr(acquisition, "_sha256_file", refuse_hash)
+
+    assert acquisition.existing_checksum(meta, raw) == "stale"
+
+
+def test_existing_checksum_verify_rehashes(tmp_path) -> None:
+    meta, raw = write_meta(tmp_path, "stale", 4)
+    assert acquisition.existing_checksum(meta, raw, verify=True) is None
+
+    meta, raw = write_meta(tmp_path, acquisition.sha256_hex(b"body"), 4)
+    assert acquisition.existing_checksum(meta, raw, verify=True) == (
+        acquisition.sha256_hex(b"body")
+    )
+
+
+def test_existing_checksum_rehashes_on_size_mismatch(tmp_path) -> None:
+    meta, raw = write_meta(tmp_path, "stale", 5)
+
+    assert acquisition.existing_checksum(meta, raw) is None
+
+
+def test_existing_checksum_rehashes_when_raw_is_newer(tmp_path) -> None:
+    meta, raw = write_meta(tmp_path, "stale", 4)
+    os.utime(raw, ns=(3_000_000_000, 3_000_000_000))
+
+    assert acquisition.existing_checksum(meta, raw) is None
@@ -0,0 +1,55 @@
+import json
+
+from tradingview_ingest import normalization
+
+
+def write_segments_file(root) -> None:
+    segments_dir = root / "artifacts" / "segments"
+    segments_dir.mkdir(parents=True)
+    segment = {
+        "source_artifact_id": "a1",
+        "canonical_url": "https://www.tradingview.com/pine-script-docs/x/",
+        "doc_type": "guide",
+        "pine_version": "v5",
+        "segment_id": "a1:1",
+        "segment_order": 1,
+        "raw_html": "<h2>Title</h2><p>x</p>",
+    }
+    (segments_dir / "20260101T000000Z.jsonl").write_text(
+        json.dumps(segment) + "\n", encoding="utf-8"
+    )
+
+
+def test_normalize_guides_skips_unchanged_inputs(tmp_path) -> None:
+    write_segments_file(tmp_path)
+
+    assert normalization.normalize_guides(str(tmp_path))[:3] == (1, 1, 0)
+    sections = tmp_path / "normalized" / "v5" / "guide_sections.jsonl"
+    before = sections.read_bytes()
+
+    assert normalization.normalize_guides(str(tmp_path))[:3] == (0, 0, 0)
+    assert sections.read_bytes() == before
+    assert (tmp_path / "artifacts" / "cache" / "normalize_guides.json").exists()
+    run_logs = sorted((tmp_path / "artifacts" / "normalization_runs").iterdir())
+    assert [path.suffix for path in run_logs] == [".jsonl", ".jsonl"]
+
+
+def test_normalize_guides_reruns_when_normalizer_changes(
+    tmp_path, monkeypatch
+) -> None:
+    write_segments_file(tmp_path)
+    normalization.normalize_guides(str(tmp_path))
+    loads = []
+    load_segments = normalization.load_segments
+
+    def counting_load_segments(path):
+        loads.append(path)
+        return load_segments(path)
+
+    monkeypatch.setattr(normalization, "load_segments", counting_load_segments)
+    normalization.normalize_guides(str(tmp_path))
+    assert loads == []
+
+    monkeypatch.setattr(normalization, "normalizer_fingerprint", lambda: "changed")
+    assert normalization.normalize_guides(str(tmp_path))[:3] == (0, 0, 0)
+    assert len(loads) == 1
@@ -0,0 +1,48 @@
+import errno
+import os
+
+import pytest
+
+from tradingview_ingest import acquisition
+
+
+def write_file(path, payload: bytes) -> str:
+    with open(path, "wb") as handle:
+        handle.write(payload)
+    return str(path)
+
+
+def test_publish_raw_links_new_artifact(tmp_path) -> None:
+    part = write_file(tmp_path / "a.html.0.part", b"new")
+    raw = str(tmp_path / "a.html")
+
+    assert acquisition.publish_raw(part, raw) is True
+    assert open(raw, "rb").read() == b"new"
+    assert not os.path.exists(part)
+
+
+def test_publish_raw_never_clobbers_existing(tmp_path) -> None:
+    raw = write_file(tmp_path / "a.html", b"old")
+    part = write_file(tmp_path / "a.html.0.part", b"new")
+
+    assert acquisition.publish_raw(part, raw) is False
+    assert open(raw, "rb").read() == b"old"
+    assert os.path.exists(part)
+
+
+@pytest.mark.parametrize("existing", [False, True])
+def test_publish_raw_without_hard_links(tmp_path, monkeypatch, existing) -> None:
+    def refuse_link(src, dst):
+        if os.path.exists(dst):
+            raise FileExistsError(errno.EEXIST, "exists", dst)
+        raise PermissionError(errno.EPERM, "hard links unsupported", dst)
+
+    monkeypatch.setattr(acquisition.os, "link", refuse_link)
+    raw = str(tmp_path / "a.html")
+    if existing:
+        write_file(raw, b"old")
+    part = write_file(tmp_path / "a.html.0.part", b"new")
+
+    assert acquisition.publish_raw(part, raw) is not existing
+    assert open(raw, "rb").read() == (b"old" if existing else b"new")
+    assert os.path.exists(part) is existing
@@ -0,0 +1,44 @@
+import json
+
+from tradingview_ingest import segmentation
+
+
+GUIDE_HTML = (
+    "<html><body><main class='content'><h2>Intro</h2><p>x</p></main></body></html>"
+)
+
+
+def write_artifact(
+    root, name: str, html: str, canonical_url: str, doc_type: str
+) -> None:
+    (root / f"{name}.html").write_text(html, encoding="utf-8")
+    meta = {"canonical_url": canonical_url, "doc_type": doc_type, "pine_version": "v6"}
+    (root / f"{name}.html.meta.json").write_text(json.dumps(meta), encoding="utf-8")
+
+
+def build_raw_tree(root) -> None:
+    write_artifact(
+        root, "bad", "<html><body></body></html>", "https://a/ref", "reference"
+    )
+    write_artifact(root, "guide", GUIDE_HTML, "https://b/guide", "guide")
+
+
+def test_reference_failure_is_recorded_and_later_artifacts_segmented(tmp_path) -> None:
+    build_raw_tree(tmp_path)
+
+    segments, failures = segmentation.segment_artifacts(str(tmp_path))
+
+    assert [(failure.source_artifact_id, failure.reason) for failure in failures] == [
+        ("bad", "reference_container_missing")
+    ]
+    assert [segment.segment_id for segment in segments] == ["guide:1"]
+
+
+def test_strict_stops_at_first_reference_failure(tmp_path) -> None:
+    build_raw_tree(tmp_path)
+
+    segments, failures = segmentation.segment_artifacts(str(tmp_path), strict=True)
+
+    assert [failure.reason for failure in failures] == ["reference_container_missing"]
+    assert segments == []
+
@@ -0,0 +1,13 @@
+import pytest
+
+from tradingview_ingest import segmentation
+
+
+def test_write_segments_open_failure_is_not_masked(tmp_path, monkeypatch) -> None:
+    def deny_open(*args, **kwargs):
+        raise PermissionError("denied")
+
+    monkeypatch.setattr(segmentation, "open", deny_open, raising=False)
+
+    with pytest.raises(PermissionError):
+        segmentation.write_segments(str(tmp_path / "segments.jsonl"), [])
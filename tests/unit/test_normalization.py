@@ -0,0 +1,23 @@
+import pytest
+
+from tradingview_ingest import normalization
+
+
+@pytest.mark.parametrize(
+    ("raw_html", "expected"),
+    [
+        ("<h2>Title</h2><p>x</p>", "h2"),
+        ("<H3 class='x'>Sub</H3>", "h3"),
+        ("<h1>Lead</h1><h3>Sub</h3><h2>Title</h2>", "h2"),
+        ("<h1>Lead</h1>", "lead"),
+        ("<p>plain</p>", "fallback"),
+        ("<!-- <h2>old</h2> --><p>x</p>", "fallback"),
+        ("<!-- <h2>old</h2> -->", "fallback"),
+        ("<script>const tag = '<h2>';</script><h3>Sub</h3>", "h3"),
+        ("<p title='<h2>'>x</p>", "fallback"),
+        ("<style>h2 { color: red }</style><h1>Lead</h1>", "lead"),
+    ],
+)
+def test_infer_section_level(raw_html: str, expected: str) -> None:
+    assert normalization.infer_section_level(raw_html) == expected
+